@@ -0,0 +1,79 @@
+"""Benchmark da busca no catálogo: LIKE original x índice normalizado (sem FTS5) x FTS5.
+
+Importa o catálogo distribuído em catalogo/catalogo-completo.csv num banco
+temporário e mede a latência de buscar_catalogo para alguns termos. A
+coluna de referência é a consulta original (LIKE '%termo%' nas colunas
+cantor, cod e musica, sem índice), executada direto no banco.
+
+Uso: python benchmarks/bench_busca_catalogo.py [REPETICOES]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from karaoke_database import KaraokeDatabase
+
+CSV_CATALOGO = os.path.join(RAIZ, "catalogo", "catalogo-completo.csv")
+TERMOS = ["sao paulo", "são paulo", "beatles", "love", "roberto carlos", "4920", "a"]
+
+# Consulta de buscar_catalogo antes do FTS5 e das colunas normalizadas
+SQL_LIKE_ORIGINAL = """
+    SELECT cantor, cod, musica, inicio FROM catalogo
+    WHERE cantor LIKE ? OR cod LIKE ? OR musica LIKE ?
+    ORDER BY cantor, musica
+"""
+
+
+def medir(db, termo, repeticoes):
+    """Retorna (latência média em ms, número de resultados)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultados = db.buscar_catalogo(termo)
+    decorrido = (time.perf_counter() - inicio) / repeticoes
+    return decorrido * 1000, len(resultados)
+
+
+def medir_like_original(conn, termo, repeticoes):
+    """Mesmo retorno de medir(), para a consulta LIKE original"""
+    padrao = f"%{termo}%"
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultados = conn.execute(SQL_LIKE_ORIGINAL, (padrao, padrao, padrao)).fetchall()
+    decorrido = (time.perf_counter() - inicio) / repeticoes
+    return decorrido * 1000, len(resultados)
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db = KaraokeDatabase(os.path.join(pasta, "bench.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            total = db.importar_catalogo_csv(CSV_CATALOGO)
+        print(f"Catálogo: {total} músicas | {repeticoes} repetições por termo")
+        print(f"{'termo':<18}{'LIKE (ms)':>12}{'sem FTS (ms)':>13}{'FTS5 (ms)':>12}"
+              f"{'res. LIKE':>11}{'res. s/FTS':>11}{'res. FTS5':>11}")
+
+        conn = sqlite3.connect(os.path.join(pasta, "bench.db"))
+        try:
+            for termo in TERMOS:
+                ms_original, n_original = medir_like_original(conn, termo, repeticoes)
+                db.fts_disponivel = False
+                ms_norm, n_norm = medir(db, termo, repeticoes)
+                db.fts_disponivel = True
+                ms_fts, n_fts = medir(db, termo, repeticoes)
+                print(f"{termo:<18}{ms_original:>12.2f}{ms_norm:>13.2f}{ms_fts:>12.2f}"
+                      f"{n_original:>11}{n_norm:>11}{n_fts:>11}")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
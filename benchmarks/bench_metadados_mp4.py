@@ -0,0 +1,102 @@
+"""Benchmark da leitura de metadados: leitor de MP4 em processo x ffprobe.
+
+Para cada arquivo mede o tempo médio de ler_metadados_mp4 (caixas do moov
+lidas via mmap) e de executar_ffprobe (subprocesso + JSON), e confere que
+os dois retornam os mesmos campos. Sem arquivos informados, gera um MP4 de
+teste com o ffmpeg.
+
+Uso: python benchmarks/bench_metadados_mp4.py [ARQUIVO_OU_PASTA ...] [--repeticoes N]
+"""
+import os
+import sys
+import subprocess
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from karaoke_media_info import executar_ffprobe, ler_metadados_mp4
+
+
+def gerar_mp4_teste(destino):
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'quiet',
+        '-f', 'lavfi', '-i', 'testsrc=size=1280x720:rate=30000/1001:d=180',
+        '-f', 'lavfi', '-i', 'sine=r=44100:d=180',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', destino
+    ], check=True)
+
+
+def listar_arquivos(argumentos):
+    arquivos = []
+    for caminho in argumentos:
+        if os.path.isdir(caminho):
+            for pasta, _, nomes in os.walk(caminho):
+                arquivos.extend(os.path.join(pasta, nome) for nome in sorted(nomes)
+                                if nome.lower().endswith(('.mp4', '.m4v', '.mov')))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+
+def diferencas(mp4, ffprobe):
+    campos = []
+    for campo, valor in ffprobe.como_dict().items():
+        outro = getattr(mp4, campo)
+        if isinstance(valor, float):
+            if abs(valor - outro) > (0.05 if campo == 'duration' else 0.01):
+                campos.append(f"{campo}: {outro} x {valor}")
+        elif valor != outro:
+            campos.append(f"{campo}: {outro} x {valor}")
+    return campos
+
+
+def medir(funcao, caminho, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao(caminho)
+    return resultado, (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    argumentos = sys.argv[1:]
+    repeticoes = 20
+    if '--repeticoes' in argumentos:
+        i = argumentos.index('--repeticoes')
+        repeticoes = int(argumentos[i + 1])
+        del argumentos[i:i + 2]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivos = listar_arquivos(argumentos)
+        if not arquivos:
+            arquivos = [os.path.join(pasta, "teste.mp4")]
+            gerar_mp4_teste(arquivos[0])
+
+        total_mp4 = total_ffprobe = 0.0
+        nao_suportados = divergentes = 0
+        for caminho in arquivos:
+            info_ffprobe, tempo_ffprobe = medir(executar_ffprobe, caminho, repeticoes)
+            info_mp4, tempo_mp4 = medir(ler_metadados_mp4, caminho, repeticoes)
+            total_ffprobe += tempo_ffprobe
+            nome = os.path.basename(caminho)
+            if info_mp4 is None:
+                nao_suportados += 1
+                print(f"  {nome}: não suportado pelo leitor de MP4 (usa o ffprobe)")
+                continue
+            total_mp4 += tempo_mp4
+            erros = diferencas(info_mp4, info_ffprobe)
+            divergentes += bool(erros)
+            print(f"  {nome}: mp4 {tempo_mp4 * 1000:8.3f} ms | ffprobe {tempo_ffprobe * 1000:8.1f} ms"
+                  + (f" | DIFERENTE: {', '.join(erros)}" if erros else ""))
+
+    suportados = len(arquivos) - nao_suportados
+    print(f"\n{len(arquivos)} arquivo(s), {repeticoes} repetições cada")
+    if suportados:
+        print(f"  leitor de MP4: {total_mp4 / suportados * 1000:8.3f} ms/arquivo")
+    print(f"  ffprobe:       {total_ffprobe / len(arquivos) * 1000:8.1f} ms/arquivo")
+    print(f"  não suportados: {nao_suportados} | com campos diferentes: {divergentes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmark de obter_playlist: custo por chamada no KaraokeDatabase.
+
+Cria um evento com alguns participantes e músicas num banco temporário e
+mede 1.000 chamadas de obter_playlist:
+  - na mesma instância do KaraokeDatabase;
+  - criando um KaraokeDatabase() a cada chamada (padrão dos handlers do main.py).
+
+Uso: python benchmarks/bench_obter_playlist.py [CHAMADAS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from karaoke_database import KaraokeDatabase
+
+
+def preparar(db):
+    evento_id = db.criar_evento("Benchmark")
+    for i in range(10):
+        participante_id = db.adicionar_participante(evento_id, f"Participante {i}")
+        for j in range(3):
+            db.adicionar_musica_playlist(evento_id, participante_id, f"/musicas/{i:02d}{j}.mp4",
+                                         musica_nome=f"Música {i}-{j}")
+    return evento_id
+
+
+def main():
+    chamadas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db_path = os.path.join(pasta, "bench.db")
+        db = KaraokeDatabase(db_path)
+        evento_id = preparar(db)
+
+        inicio = time.perf_counter()
+        for _ in range(chamadas):
+            db.obter_playlist(evento_id)
+        mesma_instancia = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for _ in range(chamadas):
+            KaraokeDatabase(db_path).obter_playlist(evento_id)
+        nova_instancia = time.perf_counter() - inicio
+
+    print(f"{chamadas} chamadas de obter_playlist (30 músicas na playlist)")
+    print(f"  mesma instância:        {mesma_instancia * 1000:8.1f} ms total | "
+          f"{mesma_instancia / chamadas * 1e6:7.1f} µs/chamada")
+    print(f"  KaraokeDatabase() novo: {nova_instancia * 1000:8.1f} ms total | "
+          f"{nova_instancia / chamadas * 1e6:7.1f} µs/chamada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark da geração de tom: chamada única do ffmpeg x trechos em paralelo.
+
+Mede o tempo de parede de renderizar_pitch (um ffmpeg, um núcleo) e de
+renderizar_pitch_paralelo com 2, 4 e todos os núcleos, a partir do mesmo
+áudio em FLAC. Sem arquivo informado, gera 4 minutos de áudio sintético
+com o próprio ffmpeg. Também confere que a duração da saída não muda.
+
+Uso: python benchmarks/bench_pitch_paralelo.py [AUDIO_OU_VIDEO] [SEMITONS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from karaoke_media_info import extrair_metadados
+from karaoke_pitch_cache import executar_ffmpeg, extrair_audio, renderizar_pitch, renderizar_pitch_paralelo
+
+
+def gerar_audio_sintetico(destino, duracao=240):
+    executar_ffmpeg([
+        'ffmpeg', '-y', '-f', 'lavfi',
+        '-i', f'aevalsrc=0.4*sin(220*2*PI*t)+0.2*sin(331*2*PI*t*(1+0.1*sin(t))):s=44100:d={duracao}',
+        '-f', 'lavfi', '-i', f'anoisesrc=a=0.05:d={duracao}:r=44100',
+        '-filter_complex', 'amix=inputs=2,aformat=channel_layouts=stereo',
+        '-c:a', 'flac', '-f', 'flac', destino
+    ])
+
+
+def medir(descricao, funcao, destino):
+    inicio = time.perf_counter()
+    funcao()
+    tempo = time.perf_counter() - inicio
+    duracao = extrair_metadados(destino).duration
+    print(f"  {descricao:<22} {tempo:7.2f}s   (saída: {duracao:.2f}s de áudio)")
+    return tempo
+
+
+def main():
+    semitons = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as pasta:
+        original = os.path.join(pasta, "original.flac")
+        if len(sys.argv) > 1:
+            extrair_audio(sys.argv[1], original)
+        else:
+            gerar_audio_sintetico(original)
+        duracao = extrair_metadados(original).duration
+        nucleos = os.cpu_count() or 1
+        print(f"Tom {semitons:+d} em {duracao:.1f}s de áudio ({nucleos} núcleos)")
+
+        destino = os.path.join(pasta, "saida.m4a")
+        base = medir("chamada única", lambda: renderizar_pitch(original, semitons, destino), destino)
+        for processos in sorted({2, 4, nucleos}):
+            tempo = medir(f"paralelo ({processos} proc.)",
+                          lambda: renderizar_pitch_paralelo(original, semitons, destino, duracao, processos),
+                          destino)
+            print(f"  {'':<22} {base / tempo:7.2f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark do protocolo painel -> player: mensagens por segundo.
+
+Compara o protocolo binário (karaoke_protocolo) com o formato anterior
+(tamanho + pickle) em:
+  - codificação + decodificação em memória;
+  - envio e recebimento por um par de sockets locais, lendo como o
+    servidor do player (processar_comandos).
+A mistura de comandos imita o uso real: um load para cada vários
+play/pause/seek/pitch.
+
+Uso: python benchmarks/bench_protocolo.py [MENSAGENS]
+"""
+import os
+import pickle
+import socket
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from karaoke_media_info import MediaInfo
+from karaoke_protocolo import codificar_mensagem, decodificar_mensagem, enviar_comando, receber_mensagem
+
+MISTURA = (
+    ('load', {'path': 'C:\\Karaoke\\Musicas\\00123.mp4',
+              'info': MediaInfo(215.46, 30000 / 1001, 1920, 1080, 48000, 'h264', 'aac')}),
+    ('play', None),
+    ('seek', {'time': 42.5}),
+    ('pitch', {'steps': -2}),
+    ('pause', None),
+    ('play', None),
+    ('seek', {'time': 90.0}),
+    ('stop', None),
+)
+
+
+def codificar_pickle(comando, dados):
+    corpo = pickle.dumps({'comando': comando, 'dados': dados})
+    return len(corpo).to_bytes(4, 'big') + corpo
+
+
+def decodificar_pickle(mensagem):
+    dados = pickle.loads(mensagem[4:])
+    return dados.get('comando'), dados.get('dados')
+
+
+def receber_pickle(conn):
+    tamanho = b''
+    while len(tamanho) < 4:
+        pacote = conn.recv(4 - len(tamanho))
+        if not pacote:
+            return None
+        tamanho += pacote
+    tamanho = int.from_bytes(tamanho, 'big')
+    data = b''
+    while len(data) < tamanho:
+        pacote = conn.recv(tamanho - len(data))
+        if not pacote:
+            return None
+        data += pacote
+    mensagem = pickle.loads(data)
+    return mensagem.get('comando'), mensagem.get('dados')
+
+
+def medir_memoria(codificar, decodificar, total):
+    inicio = time.perf_counter()
+    for i in range(total):
+        comando, dados = MISTURA[i % len(MISTURA)]
+        decodificar(codificar(comando, dados))
+    return total / (time.perf_counter() - inicio)
+
+
+def medir_socket(enviar, receber, total):
+    a, b = socket.socketpair()
+
+    def emissor():
+        for i in range(total):
+            comando, dados = MISTURA[i % len(MISTURA)]
+            enviar(a, comando, dados)
+        a.shutdown(socket.SHUT_WR)
+
+    inicio = time.perf_counter()
+    thread = threading.Thread(target=emissor)
+    thread.start()
+    recebidas = 0
+    while receber(b) is not None:
+        recebidas += 1
+    thread.join()
+    tempo = time.perf_counter() - inicio
+    a.close()
+    b.close()
+    assert recebidas == total
+    return total / tempo
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tamanho_binario = sum(len(codificar_mensagem(c, d)) for c, d in MISTURA) / len(MISTURA)
+    tamanho_pickle = sum(len(codificar_pickle(c, d)) for c, d in MISTURA) / len(MISTURA)
+
+    print(f"{total} mensagens (tamanho médio: binário {tamanho_binario:.0f} B, pickle {tamanho_pickle:.0f} B)")
+    print(f"  memória  binário: {medir_memoria(codificar_mensagem, decodificar_mensagem, total):10.0f} msg/s")
+    print(f"  memória  pickle:  {medir_memoria(codificar_pickle, decodificar_pickle, total):10.0f} msg/s")
+    print(f"  socket   binário: {medir_socket(enviar_comando, receber_mensagem, total):10.0f} msg/s")
+    print(f"  socket   pickle:  "
+          f"{medir_socket(lambda s, c, d: s.sendall(codificar_pickle(c, d)), receber_pickle, total):10.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
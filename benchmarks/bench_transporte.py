@@ -0,0 +1,69 @@
+"""Benchmark do canal de comandos: latência por comando em AF_UNIX x TCP local.
+
+Abre o servidor com criar_servidor (como o player) em cada transporte e
+mede o tempo de ida e volta de um comando 'seek': o cliente envia com
+enviar_comando, o servidor lê com receber_mensagem e responde 1 byte.
+Também abre duas instâncias seguidas para mostrar que não há colisão de
+endereço.
+
+Uso: python benchmarks/bench_transporte.py [COMANDOS]
+"""
+import os
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from karaoke_protocolo import enviar_comando, receber_mensagem
+from karaoke_transporte import conectar, criar_servidor, fechar_servidor, unix_disponivel
+
+
+def responder(servidor):
+    conn, _ = servidor.accept()
+    with conn:
+        while receber_mensagem(conn) is not None:
+            conn.sendall(b'\x01')
+
+
+def medir(preferir_unix, total):
+    servidor, endpoint = criar_servidor(preferir_unix=preferir_unix)
+    thread = threading.Thread(target=responder, args=(servidor,), daemon=True)
+    thread.start()
+    try:
+        conn = conectar(endpoint)
+        with conn:
+            for _ in range(100):  # aquecimento
+                enviar_comando(conn, 'seek', {'time': 1.0})
+                conn.recv(1)
+            inicio = time.perf_counter()
+            for i in range(total):
+                enviar_comando(conn, 'seek', {'time': float(i)})
+                conn.recv(1)
+            tempo = time.perf_counter() - inicio
+        thread.join(timeout=2)
+    finally:
+        fechar_servidor(servidor, endpoint)
+    return endpoint, tempo / total
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    transportes = ([True] if unix_disponivel() else []) + [False]
+    print(f"{total} comandos com resposta (ida e volta)")
+    for preferir_unix in transportes:
+        endpoint, latencia = medir(preferir_unix, total)
+        print(f"  {endpoint:<45} {latencia * 1e6:8.1f} µs/comando")
+
+    # Duas instâncias ao mesmo tempo: cada uma recebe um endpoint próprio
+    primeiro = criar_servidor(preferir_unix=False)
+    segundo = criar_servidor(preferir_unix=False)
+    print(f"\nDuas instâncias em TCP: {primeiro[1]} e {segundo[1]}")
+    fechar_servidor(*primeiro)
+    fechar_servidor(*segundo)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,196 @@
 import sqlite3
+from array import array
+from collections import Counter
 import json
+import os
+import re
+import threading
+import unicodedata
 from datetime import datetime
 import csv  
+import functools
+import hashlib
+import io
+import time
+
+_FTS5_DISPONIVEL = None
+
+# Conexões reutilizadas: uma por thread e por arquivo de banco (sqlite3 não compartilha
+# conexões entre threads). Cada conexão mantém seu cache de comandos preparados.
+_conexoes_thread = threading.local()
+_TAMANHO_CACHE_COMANDOS = 256
+
+# Bancos cujo esquema/migrations já foram verificados neste processo
+_bancos_inicializados = set()
+_init_lock = threading.Lock()
+
+# Ajustes de desempenho/concorrência aplicados a cada conexão. Em WAL, leituras
+# (playlist, catálogo) não esperam escritas (ex.: importação do catálogo).
+_PRAGMAS_CONEXAO = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",   # Seguro em WAL; fsync só nos checkpoints
+    "PRAGMA cache_size = -16000",    # ~16 MB de cache de páginas
+    "PRAGMA mmap_size = 268435456",  # Leituras via memória mapeada (até 256 MB)
+)
+_TIMEOUT_OCUPADO = 5.0  # segundos aguardando um lock de escrita antes de SQLITE_BUSY
+_TENTATIVAS_OCUPADO = 3
+
+# Índices secundários do catálogo (recriados após cada importação)
+_INDICES_CATALOGO = (
+    ("idx_catalogo_cantor_norm", "CREATE INDEX IF NOT EXISTS idx_catalogo_cantor_norm ON catalogo(cantor_norm)"),
+    ("idx_catalogo_musica_norm", "CREATE INDEX IF NOT EXISTS idx_catalogo_musica_norm ON catalogo(musica_norm)"),
+    ("idx_catalogo_cod", "CREATE INDEX IF NOT EXISTS idx_catalogo_cod ON catalogo(cod)"),
+    ("idx_catalogo_ordem", "CREATE INDEX IF NOT EXISTS idx_catalogo_ordem ON catalogo(cantor, musica)"),
+)
+# Índices das consultas do evento (playlist na ordem, próxima música, participantes)
+_INDICES_EVENTO = (
+    ("idx_playlist_evento_ordem", "CREATE INDEX IF NOT EXISTS idx_playlist_evento_ordem ON playlist(evento_id, ordem)"),
+    ("idx_playlist_evento_pendentes",
+     "CREATE INDEX IF NOT EXISTS idx_playlist_evento_pendentes ON playlist(evento_id, ja_tocou, ordem)"),
+    ("idx_playlist_participante", "CREATE INDEX IF NOT EXISTS idx_playlist_participante ON playlist(participante_id)"),
+    ("idx_participantes_evento_ordem",
+     "CREATE INDEX IF NOT EXISTS idx_participantes_evento_ordem ON participantes(evento_id, ordem)"),
+)
+TAMANHO_LOTE_IMPORTACAO = 2000
+
+# Migrations do esquema, em ordem: (versão, descrição, método). A versão aplicada
+# fica no PRAGMA user_version do banco; cada migration roda uma única vez.
+_MIGRATIONS = (
+    (1, "Colunas musica_nome e pontuacao_vu na playlist", "_migration_colunas_playlist"),
+    (2, "Colunas normalizadas (sem acento/pontuação) no catálogo", "_migration_colunas_normalizadas"),
+    (3, "Índices da playlist e dos participantes por evento", "_migration_indices_evento"),
+    (4, "Índices de busca do catálogo (ordenação, trigramas e FTS5)", "_migration_indices_busca"),
+    (5, "Tabela media_metadata (metadados do ffprobe por arquivo)", "_migration_metadados_midia"),
+    (6, "Índice de mídia guarda todos os arquivos de um mesmo código", "_migration_codigos_duplicados"),
+)
+VERSAO_ESQUEMA = _MIGRATIONS[-1][0]
+
+def repetir_se_ocupado(metodo):
+    """Repete a operação quando o banco continua ocupado após o busy timeout.
+    
+    A transação da tentativa que falhou é desfeita antes da nova tentativa
+    (ver KaraokeDatabase._conexao), então a operação inteira é refeita.
+    """
+    @functools.wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        for tentativa in range(1, _TENTATIVAS_OCUPADO + 1):
+            try:
+                return metodo(self, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                mensagem = str(e).lower()
+                if tentativa == _TENTATIVAS_OCUPADO or ("locked" not in mensagem and "busy" not in mensagem):
+                    raise
+                print(f"⚠️ Banco ocupado em {metodo.__name__} (tentativa {tentativa}), repetindo...")
+                time.sleep(0.1 * tentativa)
+    return wrapper
+
+def fts5_disponivel():
+    """Verifica (uma única vez) se o SQLite em uso foi compilado com FTS5"""
+    global _FTS5_DISPONIVEL
+    if _FTS5_DISPONIVEL is None:
+        try:
+            conn = sqlite3.connect(":memory:")
+            conn.execute("CREATE VIRTUAL TABLE teste_fts USING fts5(texto)")
+            conn.close()
+            _FTS5_DISPONIVEL = True
+        except sqlite3.OperationalError:
+            _FTS5_DISPONIVEL = False
+            print("⚠️ SQLite sem suporte a FTS5 - busca no catálogo usará LIKE")
+    return _FTS5_DISPONIVEL
+
+def normalizar_texto(texto):
+    """Normaliza texto para busca: sem acentos, minúsculo, sem pontuação e com espaços simples.
+    
+    Ex.: "SÃO PAULO" -> "sao paulo", "I'M NOT IN LOVE" -> "im not in love"
+    """
+    if not texto:
+        return ""
+    texto = str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower()
+    texto = re.sub(r"[^\w\s]|_", "", texto)
+    return " ".join(texto.split())
+
+def normalizar_cod(cod):
+    """Normaliza o código do catálogo como gravado no banco: sem espaços e sem o '.0' das planilhas"""
+    cod = str(cod).strip()
+    # Remove .0 do código se existir
+    if cod.endswith('.0'):
+        cod = cod[:-2]
+    return cod
+
+def gerar_trigramas(texto_norm):
+    """Retorna o conjunto de trigramas de um texto normalizado (palavras com bordas, estilo pg_trgm).
+    
+    Ex.: "beatles" -> {"  b", " be", "bea", "eat", "atl", "tle", "les", "es "}
+    """
+    return {palavra[i:i + 3]
+            for palavra in (f"  {p} " for p in texto_norm.split())
+            for i in range(len(palavra) - 2)}
 
 class KaraokeDatabase:
  
 
     def __init__(self, db_path="karaoke_eventos.db"):
         self.db_path = db_path
-        self.init_database()
+        self._chave_banco = os.path.abspath(db_path)
+        self.fts_disponivel = fts5_disponivel()
+        
+        # Esquema e migrations rodam uma única vez por processo para cada banco
+        with _init_lock:
+            if self._chave_banco not in _bancos_inicializados:
+                self.init_database()
+                _bancos_inicializados.add(self._chave_banco)
 
+    def _conexao(self):
+        """Retorna a conexão desta thread com o banco, criada uma vez e reutilizada"""
+        conexoes = getattr(_conexoes_thread, 'conexoes', None)
+        if conexoes is None:
+            conexoes = _conexoes_thread.conexoes = {}
+        
+        conn = conexoes.get(self._chave_banco)
+        if conn is None:
+            conn = sqlite3.connect(self._chave_banco, timeout=_TIMEOUT_OCUPADO,
+                                   cached_statements=_TAMANHO_CACHE_COMANDOS)
+            for pragma in _PRAGMAS_CONEXAO:
+                try:
+                    conn.execute(pragma)
+                except sqlite3.OperationalError as e:
+                    # Ex.: mídia somente leitura não permite ativar WAL
+                    print(f"⚠️ Não foi possível aplicar '{pragma}': {e}")
+            conexoes[self._chave_banco] = conn
+        elif conn.in_transaction:
+            # Transação deixada aberta por uma operação anterior que falhou
+            conn.rollback()
+        return conn
+
+    def fechar_conexao(self):
+        """Fecha a conexão desta thread com o banco (uma nova é aberta no próximo uso)"""
+        conexoes = getattr(_conexoes_thread, 'conexoes', {})
+        conn = conexoes.pop(self._chave_banco, None)
+        if conn is not None:
+            conn.close()
+
+    @repetir_se_ocupado
     def limpar_catalogo(self):
             """Remove todos os registros do catálogo de músicas."""
-            self.criar_tabela_catalogo()
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM catalogo")
+            self._apagar_catalogo(cursor)
             conn.commit()
-            conn.close()
+
+    def _apagar_catalogo(self, cursor):
+        """Apaga o catálogo e suas estruturas de busca, na transação em curso"""
+        cursor.execute("DELETE FROM catalogo")
+        if self.fts_disponivel:
+            cursor.execute("INSERT INTO catalogo_fts(catalogo_fts) VALUES ('delete-all')")
+        cursor.execute("DELETE FROM catalogo_trigramas")
         
     def criar_tabela_catalogo(self):
         """Cria a tabela do catálogo se não existir"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS catalogo (
@@ -29,17 +198,19 @@ class KaraokeDatabase:
                 cantor TEXT,
                 cod TEXT,
                 musica TEXT,
-                inicio TEXT
+                inicio TEXT,
+                cantor_norm TEXT,
+                musica_norm TEXT
             )
         """)
         conn.commit()
-        conn.close()
 
       
+    @repetir_se_ocupado
     def adicionar_musica_playlist(self, evento_id, participante_id, arquivo_path, 
                                 tom_ajuste=0, duracao_segundos=0, codigo_musica=None, musica_nome=None):
         """Adiciona uma música à playlist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         # Obter próxima ordem
@@ -57,121 +228,496 @@ class KaraokeDatabase:
         
         musica_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         return musica_id
     
         
-    def importar_catalogo_csv(self, csv_path):
-        """Importa o catálogo do CSV para o banco de dados. Retorna número de músicas importadas."""
-        import os
+    @repetir_se_ocupado
+    def importar_catalogo_csv(self, csv_path, progresso=None, substituir=False):
+        """Importa o catálogo do CSV para o banco de dados. Retorna número de músicas importadas.
+        
+        O CSV é lido em streaming e inserido em lotes com executemany. A carga
+        inteira é uma única transação (uma falha não deixa o catálogo pela metade)
+        e os índices do catálogo só são recriados depois da carga. Com
+        substituir=True o catálogo atual é apagado na mesma transação: se a
+        importação falhar, o catálogo anterior continua intacto.
+        progresso(linhas_importadas, fracao) é chamado a cada lote (fracao de 0 a 1).
+        """
         if not os.path.exists(csv_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {csv_path}")
         
-        self.criar_tabela_catalogo()
-        conn = sqlite3.connect(self.db_path)
+        try:
+            # utf-8-sig descarta o BOM (Byte Order Mark), se houver
+            return self._importar_catalogo_csv(csv_path, 'utf-8-sig', progresso, substituir)
+        except UnicodeDecodeError:
+            # Tenta com encoding diferente (a carga anterior foi desfeita)
+            return self._importar_catalogo_csv(csv_path, 'latin-1', progresso, substituir)
+
+    def _importar_catalogo_csv(self, csv_path, encoding, progresso, substituir=False):
+        conn = self._conexao()
         cursor = conn.cursor()
-        
-        linhas = []
+        tamanho_arquivo = os.path.getsize(csv_path) or 1
         linhas_importadas = 0
+        inicio = time.perf_counter()
+        
+        def inserir(lote):
+            cursor.executemany("""
+                INSERT INTO catalogo (cantor, cod, musica, inicio, cantor_norm, musica_norm)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, lote)
         
         try:
-            with open(csv_path, 'r', encoding='utf-8') as csv_file:
-                # Verifica se o arquivo tem BOM (Byte Order Mark)
-                content = csv_file.read()
-                has_bom = content.startswith('\ufeff')
-                if has_bom:
-                    content = content[1:]
-                
-                # Processa o conteúdo
-                import io
-                csv_reader = csv.reader(io.StringIO(content), delimiter=',')
-                
-                # Pula o cabeçalho
-                next(csv_reader, None)
+            cursor.execute("BEGIN")
+            if substituir:
+                self._apagar_catalogo(cursor)
+            for nome, _ in _INDICES_CATALOGO:
+                cursor.execute(f"DROP INDEX IF EXISTS {nome}")
+            
+            with open(csv_path, 'rb') as arquivo:
+                lote = []
+                for cantor, cod, musica, inicio_letra in self._ler_linhas_csv(arquivo, encoding):
+                    lote.append((cantor, cod, musica, inicio_letra,
+                                 normalizar_texto(cantor), normalizar_texto(musica)))
+                    if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+                        inserir(lote)
+                        linhas_importadas += len(lote)
+                        lote = []
+                        if progresso:
+                            progresso(linhas_importadas, min(arquivo.tell() / tamanho_arquivo, 0.99))
                 
-                for row_num, row in enumerate(csv_reader, 2):  # Começa da linha 2 (após cabeçalho)
-                    if len(row) >= 4:
-                        cantor = row[0].strip()
-                        cod = str(row[1]).strip()
-                        musica = row[2].strip()
-                        inicio = row[3].strip()
-                        
-                        # Remove .0 do código se existir
-                        if cod.endswith('.0'):
-                            cod = cod[:-2]
-                        
-                        linhas.append((cantor, cod, musica, inicio))
-                        linhas_importadas += 1
-                    else:
-                        print(f"[AVISO] Linha {row_num} ignorada - formato inválido: {row}")
+                if lote:
+                    inserir(lote)
+                    linhas_importadas += len(lote)
+            
+            # Índices e estruturas de busca são montados uma única vez, após a carga
+            for _, ddl in _INDICES_CATALOGO:
+                cursor.execute(ddl)
+            if self.fts_disponivel:
+                cursor.execute("INSERT INTO catalogo_fts(catalogo_fts) VALUES ('rebuild')")
+            self._reconstruir_trigramas(cursor)
+            
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        
+        if progresso:
+            progresso(linhas_importadas, 1.0)
+        print(f"[CATALOGO] {linhas_importadas} músicas importadas em {time.perf_counter() - inicio:.2f}s")
+        return linhas_importadas
+
+    @staticmethod
+    def _ler_linhas_csv(arquivo, encoding):
+        """Lê o CSV do catálogo (arquivo binário) e gera tuplas (cantor, cod, musica, inicio)"""
+        csv_reader = csv.reader(io.TextIOWrapper(arquivo, encoding=encoding, newline=''), delimiter=',')
+        
+        # Pula o cabeçalho
+        next(csv_reader, None)
+        
+        for row_num, row in enumerate(csv_reader, 2):  # Começa da linha 2 (após cabeçalho)
+            if len(row) < 4:
+                print(f"[AVISO] Linha {row_num} ignorada - formato inválido: {row}")
+                continue
+            
+            yield row[0].strip(), normalizar_cod(row[1]), row[2].strip(), row[3].strip()
+
+    @staticmethod
+    def _hash_linha(cantor, cod, musica, inicio):
+        """Hash do conteúdo de uma linha do catálogo, usado para detectar alterações"""
+        conteudo = "\x1f".join((cantor or "", cod or "", musica or "", inicio or ""))
+        return hashlib.blake2b(conteudo.encode('utf-8'), digest_size=16).digest()
+
+    @repetir_se_ocupado
+    def sincronizar_catalogo_csv(self, csv_path):
+        """Atualiza o catálogo a partir do CSV aplicando apenas as diferenças, por código.
+        
+        Cada linha do CSV é comparada pelo hash com a versão no banco: códigos
+        novos são inseridos, códigos cujas linhas mudaram são substituídos e
+        códigos que sumiram do CSV são removidos; os demais não são tocados.
+        Os índices de busca (FTS e trigramas) são atualizados só nas linhas
+        alteradas. Retorna um dicionário com as contagens de códigos
+        ('novos', 'alterados', 'removidos', 'inalterados').
+        """
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"Arquivo não encontrado: {csv_path}")
         
+        try:
+            # utf-8-sig descarta o BOM (Byte Order Mark), se houver
+            with open(csv_path, 'rb') as arquivo:
+                linhas_csv = list(self._ler_linhas_csv(arquivo, 'utf-8-sig'))
         except UnicodeDecodeError:
-            # Tenta com encoding diferente
-            with open(csv_path, 'r', encoding='latin-1') as csv_file:
-                csv_reader = csv.reader(csv_file, delimiter=',')
-                next(csv_reader, None)  # Pula cabeçalho
-                
-                for row_num, row in enumerate(csv_reader, 2):
-                    if len(row) >= 4:
-                        cantor = row[0].strip()
-                        cod = str(row[1]).strip()
-                        musica = row[2].strip()
-                        inicio = row[3].strip()
-                        
-                        if cod.endswith('.0'):
-                            cod = cod[:-2]
-                        
-                        linhas.append((cantor, cod, musica, inicio))
-                        linhas_importadas += 1
-        
-        # Logging: print detalhado para cada linha importada
-        for idx, (cantor, cod, musica, inicio) in enumerate(linhas, 1):
-            cursor.execute("INSERT INTO catalogo (cantor, cod, musica, inicio) VALUES (?, ?, ?, ?)", 
-                        (cantor, cod, musica, inicio))
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            print(f"[{now}] Incluindo catálogo {idx}: cantor='{cantor}', cod='{cod}', musica='{musica}', inicio='{inicio}'")
+            with open(csv_path, 'rb') as arquivo:
+                linhas_csv = list(self._ler_linhas_csv(arquivo, 'latin-1'))
         
-        conn.commit()
-        conn.close()
-        return linhas_importadas
+        inicio = time.perf_counter()
+        
+        # Um código pode aparecer em mais de uma linha: compara o conjunto de linhas de cada código
+        novas_por_cod = {}
+        for linha in linhas_csv:
+            novas_por_cod.setdefault(linha[1], []).append(linha)
+        hashes_csv = {cod: sorted(self._hash_linha(*linha) for linha in linhas)
+                      for cod, linhas in novas_por_cod.items()}
+        
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, cantor, cod, musica, inicio, cantor_norm, musica_norm FROM catalogo")
+        atuais_por_cod = {}
+        for linha in cursor.fetchall():
+            atuais_por_cod.setdefault(linha[2], []).append(linha)
+        
+        novos = [cod for cod in novas_por_cod if cod not in atuais_por_cod]
+        removidos = [cod for cod in atuais_por_cod if cod not in novas_por_cod]
+        alterados = [cod for cod in novas_por_cod if cod in atuais_por_cod and
+                     hashes_csv[cod] != sorted(self._hash_linha(*linha[1:5]) for linha in atuais_por_cod[cod])]
+        
+        linhas_removidas = [linha for cod in removidos + alterados for linha in atuais_por_cod[cod]]
+        linhas_inseridas = []
+        
+        try:
+            cursor.execute("BEGIN")
+            cursor.executemany("DELETE FROM catalogo WHERE id = ?", [(linha[0],) for linha in linhas_removidas])
+            for cod in novos + alterados:
+                for cantor, cod_linha, musica, inicio_letra in novas_por_cod[cod]:
+                    cantor_norm, musica_norm = normalizar_texto(cantor), normalizar_texto(musica)
+                    cursor.execute("""
+                        INSERT INTO catalogo (cantor, cod, musica, inicio, cantor_norm, musica_norm)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (cantor, cod_linha, musica, inicio_letra, cantor_norm, musica_norm))
+                    linhas_inseridas.append((cursor.lastrowid, cantor, cod_linha, musica, inicio_letra,
+                                             cantor_norm, musica_norm))
+            
+            if self.fts_disponivel:
+                cursor.executemany("""
+                    INSERT INTO catalogo_fts (catalogo_fts, rowid, cantor_norm, musica_norm, inicio, cod)
+                    VALUES ('delete', ?, ?, ?, ?, ?)
+                """, [(id_, cantor_norm, musica_norm, inicio_letra, cod)
+                      for id_, _, cod, _, inicio_letra, cantor_norm, musica_norm in linhas_removidas])
+                cursor.executemany("""
+                    INSERT INTO catalogo_fts (rowid, cantor_norm, musica_norm, inicio, cod)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(id_, cantor_norm, musica_norm, inicio_letra, cod)
+                      for id_, _, cod, _, inicio_letra, cantor_norm, musica_norm in linhas_inseridas])
+            self._atualizar_trigramas(cursor,
+                                      [(linha[0], linha[5], linha[6]) for linha in linhas_removidas],
+                                      [(linha[0], linha[5], linha[6]) for linha in linhas_inseridas])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        
+        resultado = {
+            'novos': len(novos),
+            'alterados': len(alterados),
+            'removidos': len(removidos),
+            'inalterados': len(novas_por_cod) - len(novos) - len(alterados),
+        }
+        print(f"[CATALOGO] Sincronização: {resultado['novos']} códigos novos, "
+              f"{resultado['alterados']} alterados, {resultado['removidos']} removidos, "
+              f"{resultado['inalterados']} inalterados em {time.perf_counter() - inicio:.2f}s")
+        return resultado
 
     # Mantenha o método buscar_catalogo existente para compatibilidade
     def buscar_catalogo(self, termo=None, limite=None):
-        """Busca músicas/cantores/códigos no catálogo. Retorna lista de tuplas."""
-        self.criar_tabela_catalogo()
-        conn = sqlite3.connect(self.db_path)
+        """Busca músicas/cantores/códigos no catálogo. Retorna lista de tuplas.
+        
+        A busca ignora acentos, maiúsculas e pontuação (colunas *_norm). Com FTS5,
+        cada palavra do termo é buscada como prefixo em cantor, música e código,
+        ordenando por relevância (bm25). Sem FTS5 (ou se o MATCH falhar), ver
+        _buscar_catalogo_sem_fts.
+        """
+        conn = self._conexao()
         cursor = conn.cursor()
         if termo:
-            cursor.execute("""
-                SELECT cantor, cod, musica, inicio FROM catalogo
-                WHERE cantor LIKE ? OR cod LIKE ? OR musica LIKE ?
-                ORDER BY cantor, musica
-            """, (f"%{termo}%", f"%{termo}%", f"%{termo}%"))
+            rows = None
+            termo_norm = normalizar_texto(termo)
+            consulta = self._consulta_fts(termo_norm) if self.fts_disponivel else None
+            if consulta:
+                try:
+                    cursor.execute("""
+                        SELECT c.cantor, c.cod, c.musica, c.inicio
+                        FROM catalogo_fts
+                        JOIN catalogo c ON c.id = catalogo_fts.rowid
+                        WHERE catalogo_fts MATCH ?
+                        ORDER BY bm25(catalogo_fts, 2.0, 2.0, 0.0, 1.0), c.cantor, c.musica
+                    """, (consulta,))
+                    rows = cursor.fetchall()
+                except sqlite3.OperationalError as e:
+                    print(f"⚠️ Erro na busca FTS, usando índice normalizado: {e}")
+            if rows is None and not termo_norm:
+                # Só pontuação/espaços: nada a buscar em cantor/música, apenas o código exato
+                cursor.execute("""
+                    SELECT cantor, cod, musica, inicio FROM catalogo
+                    WHERE cod = ?
+                    ORDER BY cantor, musica
+                """, (termo.strip(),))
+                rows = cursor.fetchall()
+            elif rows is None:
+                rows = self._buscar_catalogo_sem_fts(cursor, termo.strip(), termo_norm)
         else:
             if limite:
                 cursor.execute("SELECT cantor, cod, musica, inicio FROM catalogo ORDER BY cantor, musica LIMIT ?", (limite,))
             else:
                 cursor.execute("SELECT cantor, cod, musica, inicio FROM catalogo ORDER BY cantor, musica")
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         return rows
 
+    def _buscar_catalogo_sem_fts(self, cursor, termo, termo_norm):
+        """Busca sem FTS5, sempre por índice, ordenada por cantor e música.
+        
+        O termo normalizado é buscado como substring de cantor_norm/musica_norm:
+        os candidatos são os ids presentes nas listas de todos os trigramas que
+        qualquer texto contendo o termo tem (catalogo_trigramas, ver
+        _trigramas_substring) e só eles passam pelo LIKE. Termos sem trigrama
+        (uma palavra de 1 ou 2 letras, ex.: "a") são buscados como prefixo nos
+        índices de cantor_norm e musica_norm. O código é buscado como prefixo
+        no índice de cod.
+        """
+        trigramas = self._trigramas_substring(termo_norm)
+        encontrados = {}
+        
+        if trigramas:
+            cursor.execute(f"""
+                SELECT trigrama, ids FROM catalogo_trigramas
+                WHERE trigrama IN ({",".join("?" * len(trigramas))})
+            """, tuple(trigramas))
+            listas = [blob for _, blob in cursor.fetchall()]
+            candidatos = set()
+            if len(listas) == len(trigramas):
+                # Intersecção a partir da lista mais curta (a mais seletiva)
+                for blob in sorted(listas, key=len):
+                    ids = array('i')
+                    ids.frombytes(blob)
+                    candidatos = set(ids) if not candidatos else candidatos.intersection(ids)
+                    if not candidatos:
+                        break
+            candidatos = list(candidatos)
+            for inicio in range(0, len(candidatos), 500):
+                bloco = candidatos[inicio:inicio + 500]
+                cursor.execute(f"""
+                    SELECT id, cantor, cod, musica, inicio FROM catalogo
+                    WHERE id IN ({",".join("?" * len(bloco))})
+                      AND (cantor_norm LIKE '%' || ? || '%' OR musica_norm LIKE '%' || ? || '%')
+                """, (*bloco, termo_norm, termo_norm))
+                encontrados.update((row[0], row[1:]) for row in cursor.fetchall())
+        else:
+            de, ate = self._faixa_prefixo(termo_norm)
+            cursor.execute("""
+                SELECT id, cantor, cod, musica, inicio FROM catalogo
+                WHERE (cantor_norm >= ? AND cantor_norm < ?) OR (musica_norm >= ? AND musica_norm < ?)
+            """, (de, ate, de, ate))
+            encontrados.update((row[0], row[1:]) for row in cursor.fetchall())
+        
+        de, ate = self._faixa_prefixo(termo)
+        cursor.execute("""
+            SELECT id, cantor, cod, musica, inicio FROM catalogo
+            WHERE cod >= ? AND cod < ?
+        """, (de, ate))
+        encontrados.update((row[0], row[1:]) for row in cursor.fetchall())
+        
+        # Mesma ordem do ORDER BY cantor, musica (NULL primeiro, depois por código)
+        return sorted(encontrados.values(), key=lambda r: (r[0] is not None, r[0] or "", r[2] is not None, r[2] or ""))
+    
+    @staticmethod
+    def _trigramas_substring(termo_norm):
+        """Trigramas (no formato de gerar_trigramas) presentes em todo texto que contém termo_norm.
+        
+        A primeira palavra do termo pode ser o fim de uma palavra do texto e a
+        última, o começo; as do meio são palavras inteiras, com as bordas.
+        """
+        palavras = termo_norm.split()
+        if len(palavras) == 1:
+            trechos = palavras
+        else:
+            trechos = [f"{palavras[0]} "] + [f"  {p} " for p in palavras[1:-1]] + [f"  {palavras[-1]}"]
+        return {trecho[i:i + 3] for trecho in trechos for i in range(len(trecho) - 2)}
+    
+    @staticmethod
+    def _faixa_prefixo(prefixo):
+        """Limites [de, ate) dos textos que começam com prefixo, para buscas por faixa no índice"""
+        return prefixo, prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+    
+    def buscar_catalogo_aproximado(self, termo, limite=50, similaridade_minima=0.3):
+        """Busca tolerante a erros de digitação em cantor/música usando o índice de trigramas.
+        
+        Os candidatos vêm do índice (apenas os trigramas mais raros do termo são
+        consultados) e só eles são pontuados: fração dos trigramas do termo
+        presentes no cantor ou na música, com desempate pela similaridade de Jaccard.
+        Retorna lista de tuplas (cantor, cod, musica, inicio), da mais parecida para a menos.
+        """
+        trigramas_termo = gerar_trigramas(normalizar_texto(termo))
+        if not trigramas_termo:
+            return []
+        
+        conn = self._conexao()
+        cursor = conn.cursor()
+        
+        marcadores = ",".join("?" * len(trigramas_termo))
+        cursor.execute(f"""
+            SELECT trigrama, ids FROM catalogo_trigramas
+            WHERE trigrama IN ({marcadores})
+        """, tuple(trigramas_termo))
+        listas = {trigrama: ids for trigrama, ids in cursor.fetchall()}
+        if not listas:
+            return []
+        
+        # Trigramas raros (listas menores) são os mais seletivos; metade + 1 ainda tolera um erro de digitação
+        seletivos = sorted(listas, key=lambda t: len(listas[t]))
+        seletivos = seletivos[:len(trigramas_termo) // 2 + 1]
+        
+        comuns_por_id = Counter()
+        for trigrama in seletivos:
+            ids = array('i')
+            ids.frombytes(listas[trigrama])
+            comuns_por_id.update(ids)
+        ids_candidatos = [id_ for id_, _ in comuns_por_id.most_common(max(limite * 8, 200))]
+        
+        marcadores = ",".join("?" * len(ids_candidatos))
+        cursor.execute(f"""
+            SELECT id, cantor, cod, musica, inicio, cantor_norm, musica_norm
+            FROM catalogo WHERE id IN ({marcadores})
+        """, ids_candidatos)
+        candidatos = cursor.fetchall()
+        
+        pontuados = []
+        total = len(trigramas_termo)
+        for _, cantor, cod, musica, inicio, cantor_norm, musica_norm in candidatos:
+            melhor = (0.0, 0.0)
+            for campo in (cantor_norm, musica_norm):
+                trigramas_campo = gerar_trigramas(campo or "")
+                comuns = len(trigramas_termo & trigramas_campo)
+                if comuns:
+                    jaccard = comuns / (total + len(trigramas_campo) - comuns)
+                    melhor = max(melhor, (comuns / total, jaccard))
+            if melhor[0] >= similaridade_minima:
+                pontuados.append((melhor, cantor or "", musica or "", (cantor, cod, musica, inicio)))
+        
+        pontuados.sort(key=lambda p: (-p[0][0], -p[0][1], p[1], p[2]))
+        return [p[3] for p in pontuados[:limite]]
+
+    def _reconstruir_trigramas(self, cursor):
+        """Recria o índice de trigramas a partir do catálogo.
+        
+        Cada trigrama vira uma única linha com a lista de ids que o contêm
+        (inteiros de 32 bits empacotados), em vez de uma linha por par trigrama/id.
+        """
+        cursor.execute("DELETE FROM catalogo_trigramas")
+        cursor.execute("SELECT id, cantor_norm, musica_norm FROM catalogo")
+        listas = {}
+        for id_, cantor_norm, musica_norm in cursor.fetchall():
+            for trigrama in gerar_trigramas(f"{cantor_norm or ''} {musica_norm or ''}"):
+                ids = listas.get(trigrama)
+                if ids is None:
+                    ids = listas[trigrama] = array('i')
+                ids.append(id_)
+        cursor.executemany("INSERT INTO catalogo_trigramas (trigrama, ids) VALUES (?, ?)",
+                           ((trigrama, ids.tobytes()) for trigrama, ids in listas.items()))
+
+    def _atualizar_trigramas(self, cursor, removidas, inseridas):
+        """Atualiza o índice de trigramas só para as linhas alteradas.
+        
+        removidas e inseridas são listas de (id, cantor_norm, musica_norm); apenas
+        as listas de ids dos trigramas dessas linhas são lidas e regravadas.
+        """
+        if not removidas and not inseridas:
+            return
+        
+        def trigramas_linha(cantor_norm, musica_norm):
+            return gerar_trigramas(f"{cantor_norm or ''} {musica_norm or ''}")
+        
+        remover = {}
+        for id_, cantor_norm, musica_norm in removidas:
+            for trigrama in trigramas_linha(cantor_norm, musica_norm):
+                remover.setdefault(trigrama, set()).add(id_)
+        adicionar = {}
+        for id_, cantor_norm, musica_norm in inseridas:
+            for trigrama in trigramas_linha(cantor_norm, musica_norm):
+                adicionar.setdefault(trigrama, []).append(id_)
+        
+        afetados = list(remover.keys() | adicionar.keys())
+        listas = {}
+        for inicio in range(0, len(afetados), 500):
+            bloco = afetados[inicio:inicio + 500]
+            cursor.execute(f"""
+                SELECT trigrama, ids FROM catalogo_trigramas
+                WHERE trigrama IN ({",".join("?" * len(bloco))})
+            """, bloco)
+            for trigrama, blob in cursor.fetchall():
+                ids = array('i')
+                ids.frombytes(blob)
+                listas[trigrama] = ids
+        
+        gravar, apagar = [], []
+        for trigrama in afetados:
+            ids = listas.get(trigrama, array('i'))
+            if trigrama in remover:
+                ids = array('i', (id_ for id_ in ids if id_ not in remover[trigrama]))
+            ids.extend(adicionar.get(trigrama, ()))
+            if ids:
+                gravar.append((trigrama, ids.tobytes()))
+            else:
+                apagar.append((trigrama,))
+        cursor.executemany("INSERT OR REPLACE INTO catalogo_trigramas (trigrama, ids) VALUES (?, ?)", gravar)
+        cursor.executemany("DELETE FROM catalogo_trigramas WHERE trigrama = ?", apagar)
+
+    @staticmethod
+    def _consulta_fts(termo_norm):
+        """Monta a expressão MATCH do FTS5: todas as palavras do termo normalizado como prefixo"""
+        palavras = termo_norm.split()
+        if not palavras:
+            return None
+        prefixos = " ".join(f'"{palavra}"*' for palavra in palavras)
+        return f"{{cantor_norm musica_norm cod}} : ({prefixos})"
+
+    def contar_catalogo(self):
+        """Retorna o número de músicas no catálogo"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM catalogo")
+        total = cursor.fetchone()[0]
+        return total
+
+    def buscar_catalogo_pagina(self, apos=None, tamanho=200):
+        """Retorna uma página do catálogo ordenado por (cantor, musica, id) usando paginação por chave.
+        
+        apos: chave (cantor, musica, id) retornada pela página anterior, ou None para a primeira.
+        Retorna (linhas, proxima_chave); proxima_chave é None quando não há mais páginas.
+        """
+        conn = self._conexao()
+        cursor = conn.cursor()
+        if apos is None:
+            cursor.execute("""
+                SELECT cantor, cod, musica, inicio, id FROM catalogo
+                ORDER BY cantor, musica, id
+                LIMIT ?
+            """, (tamanho,))
+        else:
+            cursor.execute("""
+                SELECT cantor, cod, musica, inicio, id FROM catalogo
+                WHERE (cantor, musica, id) > (?, ?, ?)
+                ORDER BY cantor, musica, id
+                LIMIT ?
+            """, (*apos, tamanho))
+        rows = cursor.fetchall()
+        
+        proxima_chave = None
+        if len(rows) == tamanho:
+            ultimo = rows[-1]
+            proxima_chave = (ultimo[0], ultimo[2], ultimo[4])
+        return [row[:4] for row in rows], proxima_chave
+
     # Adicione este método após o método buscar_catalogo
 
     def buscar_musica_por_codigo(self, codigo):
         """Busca uma música específica pelo código"""
-        self.criar_tabela_catalogo()
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
             SELECT cantor, cod, musica, inicio FROM catalogo
             WHERE cod = ?
-        """, (codigo,))
+        """, (normalizar_cod(codigo),))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {
@@ -182,30 +728,173 @@ class KaraokeDatabase:
             }
         return None
 
+    def listar_codigos_catalogo(self):
+        """Retorna a lista de códigos distintos do catálogo"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT cod FROM catalogo WHERE cod IS NOT NULL AND cod != ''")
+        codigos = [row[0] for row in cursor.fetchall()]
+        return codigos
+
+    @repetir_se_ocupado
+    def limpar_indice_midia(self, pasta_raiz):
+        """Remove o índice de mídia (arquivos e diretórios) de uma pasta raiz"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM midia_arquivos WHERE pasta_raiz = ?", (pasta_raiz,))
+        cursor.execute("DELETE FROM midia_diretorios WHERE pasta_raiz = ?", (pasta_raiz,))
+        conn.commit()
+
+    def carregar_diretorios_midia(self, pasta_raiz):
+        """Retorna o estado salvo dos diretórios: {diretorio: (pai, mtime, num_arquivos)}"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT diretorio, pai, mtime, num_arquivos FROM midia_diretorios
+            WHERE pasta_raiz = ?
+        """, (pasta_raiz,))
+        diretorios = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+        return diretorios
+
+    @repetir_se_ocupado
+    def atualizar_diretorios_midia(self, pasta_raiz, relistados, removidos):
+        """Grava em uma única transação o resultado de um reescaneamento.
+        
+        relistados: {diretorio: (pai, mtime, [(codigo, caminho), ...])}
+        removidos: diretórios que não existem mais
+        """
+        conn = self._conexao()
+        cursor = conn.cursor()
+        
+        for diretorio in removidos:
+            cursor.execute("DELETE FROM midia_arquivos WHERE pasta_raiz = ? AND diretorio = ?",
+                           (pasta_raiz, diretorio))
+            cursor.execute("DELETE FROM midia_diretorios WHERE pasta_raiz = ? AND diretorio = ?",
+                           (pasta_raiz, diretorio))
+        
+        for diretorio, (pai, mtime, arquivos) in relistados.items():
+            cursor.execute("DELETE FROM midia_arquivos WHERE pasta_raiz = ? AND diretorio = ?",
+                           (pasta_raiz, diretorio))
+            cursor.executemany("""
+                INSERT OR IGNORE INTO midia_arquivos (pasta_raiz, codigo, caminho, diretorio)
+                VALUES (?, ?, ?, ?)
+            """, [(pasta_raiz, codigo, caminho, diretorio) for codigo, caminho in arquivos])
+            cursor.execute("""
+                INSERT OR REPLACE INTO midia_diretorios (pasta_raiz, diretorio, pai, mtime, num_arquivos)
+                VALUES (?, ?, ?, ?, ?)
+            """, (pasta_raiz, diretorio, pai, mtime, len(arquivos)))
+        
+        conn.commit()
+
+    def carregar_indice_midia(self, pasta_raiz):
+        """Retorna o índice de mídia de uma pasta raiz como dicionário {codigo: caminho}
+        
+        Se vários arquivos tiverem o mesmo código (ex.: 123.mp4 e 00123.mp4), vale
+        o de menor caminho, independente da ordem em que foram encontrados.
+        """
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT codigo, MIN(caminho) FROM midia_arquivos WHERE pasta_raiz = ?
+            GROUP BY codigo
+        """, (pasta_raiz,))
+        indice = dict(cursor.fetchall())
+        return indice
+    
+    def listar_codigos_duplicados(self, pasta_raiz):
+        """Retorna {codigo: [caminhos em ordem]} dos códigos com mais de um arquivo na pasta raiz"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT codigo, caminho FROM midia_arquivos
+            WHERE pasta_raiz = ? AND codigo IN (
+                SELECT codigo FROM midia_arquivos WHERE pasta_raiz = ?
+                GROUP BY codigo HAVING COUNT(*) > 1
+            )
+            ORDER BY codigo, caminho
+        """, (pasta_raiz, pasta_raiz))
+        duplicados = {}
+        for codigo, caminho in cursor.fetchall():
+            duplicados.setdefault(codigo, []).append(caminho)
+        return duplicados
+
+    def obter_metadados_midia(self, caminho, tamanho, mtime_ns):
+        """Retorna os metadados salvos do arquivo, ou None se ele nunca foi sondado ou mudou desde então"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT duracao, fps, largura, altura, taxa_audio, codec_video, codec_audio
+            FROM media_metadata WHERE caminho = ? AND tamanho = ? AND mtime_ns = ?
+        """, (caminho, tamanho, mtime_ns))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {'duration': row[0], 'fps': row[1], 'width': row[2], 'height': row[3],
+                'sample_rate': row[4], 'video_codec': row[5], 'audio_codec': row[6]}
+
+    def carregar_assinaturas_metadados(self):
+        """Retorna {caminho: (tamanho, mtime_ns)} de todos os arquivos com metadados salvos"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.execute("SELECT caminho, tamanho, mtime_ns FROM media_metadata")
+        assinaturas = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        return assinaturas
+
+    def salvar_metadados_midia(self, caminho, tamanho, mtime_ns, info):
+        """Salva (ou substitui) os metadados do arquivo, no formato retornado por sondar_midia"""
+        self.salvar_metadados_midia_lote([(caminho, tamanho, mtime_ns, info)])
+
+    @repetir_se_ocupado
+    def salvar_metadados_midia_lote(self, registros):
+        """Salva em uma única transação uma lista de (caminho, tamanho, mtime_ns, info)"""
+        conn = self._conexao()
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO media_metadata
+                (caminho, tamanho, mtime_ns, duracao, fps, largura, altura, taxa_audio, codec_video, codec_audio)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(caminho, tamanho, mtime_ns, info['duration'], info['fps'], info['width'], info['height'],
+               info['sample_rate'], info['video_codec'], info['audio_codec'])
+              for caminho, tamanho, mtime_ns, info in registros])
+        conn.commit()
+
+    @repetir_se_ocupado
     def remover_participante(self, participante_id):
         """Remove um participante e todas as suas músicas da playlist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         # Remove músicas da playlist desse participante
         cursor.execute("DELETE FROM playlist WHERE participante_id = ?", (participante_id,))
         # Remove o participante
         cursor.execute("DELETE FROM participantes WHERE id = ?", (participante_id,))
         conn.commit()
-        conn.close()
 
+    @repetir_se_ocupado
     def remover_musica_playlist(self, musica_id):
         """Remove uma música da playlist pelo ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM playlist WHERE id = ?", (musica_id,))
         conn.commit()
-        conn.close()
     
     def init_database(self):
-        """Inicializa o banco de dados com as tabelas necessárias"""
-        conn = sqlite3.connect(self.db_path)
+        """Inicializa o banco de dados com as tabelas necessárias.
+        
+        Com o banco já na versão atual do esquema, só lê o PRAGMA user_version.
+        """
+        conn = self._conexao()
         cursor = conn.cursor()
         
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= VERSAO_ESQUEMA:
+            if self.fts_disponivel:
+                # Banco migrado onde o SQLite não tinha FTS5: cria o índice textual agora
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalogo_fts'")
+                if cursor.fetchone() is None:
+                    self._criar_fts(cursor)
+                    conn.commit()
+            return
+        
         # Tabela de eventos
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS eventos (
@@ -257,46 +946,167 @@ class KaraokeDatabase:
                 cantor TEXT,
                 cod TEXT,
                 musica TEXT,
-                inicio TEXT
+                inicio TEXT,
+                cantor_norm TEXT,
+                musica_norm TEXT
+            )
+        """)
+        
+        # Índice de arquivos de mídia (código -> caminho) da pasta de músicas
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS midia_arquivos (
+                pasta_raiz TEXT NOT NULL,
+                codigo TEXT NOT NULL,
+                caminho TEXT NOT NULL,
+                diretorio TEXT NOT NULL,
+                PRIMARY KEY (pasta_raiz, codigo, caminho)
+            )
+        """)
+        
+        # Estado dos diretórios da pasta de músicas (para reescaneamento incremental)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS midia_diretorios (
+                pasta_raiz TEXT NOT NULL,
+                diretorio TEXT NOT NULL,
+                pai TEXT,
+                mtime REAL NOT NULL,
+                num_arquivos INTEGER DEFAULT 0,
+                PRIMARY KEY (pasta_raiz, diretorio)
             )
         """)
         
         conn.commit()
-        conn.close()
         
-        # Executa migrations para adicionar colunas que possam estar faltando em bancos antigos
+        # Aplica as migrations pendentes (colunas, índices) em bancos novos ou antigos
         self._executar_migrations()
     
     def _executar_migrations(self):
-        """Executa migrations para adicionar colunas que possam estar faltando em bancos existentes"""
-        conn = sqlite3.connect(self.db_path)
+        """Aplica, em ordem, as migrations com versão acima do PRAGMA user_version do banco.
+        
+        Cada migration roda numa transação junto com a atualização do user_version,
+        então nunca é aplicada duas vezes nem fica pela metade. Bancos anteriores ao
+        controle de versão (user_version 0) passam por todas, que verificam o que já existe.
+        """
+        conn = self._conexao()
         cursor = conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        versao = cursor.fetchone()[0]
         
-        try:
-            # Migration 1: Adicionar coluna musica_nome na playlist se não existir
-            cursor.execute("PRAGMA table_info(playlist)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'musica_nome' not in columns:
-                cursor.execute("ALTER TABLE playlist ADD COLUMN musica_nome TEXT")
-            
-            if 'pontuacao_vu' not in columns:
-                cursor.execute("ALTER TABLE playlist ADD COLUMN pontuacao_vu REAL DEFAULT 0")
+        for numero, descricao, metodo in _MIGRATIONS:
+            if numero <= versao:
+                continue
+            try:
+                cursor.execute("BEGIN")
+                getattr(self, metodo)(cursor)
+                cursor.execute(f"PRAGMA user_version = {numero}")
                 conn.commit()
-                print("✅ Migration: Coluna 'musica_nome' adicionada à tabela playlist")
-            
-            # Adicione aqui futuras migrations conforme necessário
-            # Migration 2: ...
-            # Migration 3: ...
-            
-        except Exception as e:
-            print(f"⚠️ Erro ao executar migrations: {e}")
-        finally:
-            conn.close()
+            except Exception as e:
+                conn.rollback()
+                # As próximas podem depender desta: tenta de novo na próxima abertura
+                print(f"⚠️ Erro ao executar migration {numero} ({descricao}): {e}")
+                return
+            print(f"✅ Migration {numero}: {descricao}")
+    
+    def _migration_colunas_playlist(self, cursor):
+        cursor.execute("PRAGMA table_info(playlist)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'musica_nome' not in columns:
+            cursor.execute("ALTER TABLE playlist ADD COLUMN musica_nome TEXT")
+        
+        if 'pontuacao_vu' not in columns:
+            cursor.execute("ALTER TABLE playlist ADD COLUMN pontuacao_vu REAL DEFAULT 0")
+    
+    def _migration_colunas_normalizadas(self, cursor):
+        cursor.execute("PRAGMA table_info(catalogo)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'cantor_norm' not in columns:
+            cursor.execute("ALTER TABLE catalogo ADD COLUMN cantor_norm TEXT")
+            cursor.execute("ALTER TABLE catalogo ADD COLUMN musica_norm TEXT")
+            cursor.execute("SELECT id, cantor, musica FROM catalogo")
+            cursor.executemany(
+                "UPDATE catalogo SET cantor_norm = ?, musica_norm = ? WHERE id = ?",
+                [(normalizar_texto(cantor), normalizar_texto(musica), id_)
+                 for id_, cantor, musica in cursor.fetchall()]
+            )
+    
+    def _migration_indices_evento(self, cursor):
+        for _, ddl in _INDICES_EVENTO:
+            cursor.execute(ddl)
+    
+    def _migration_indices_busca(self, cursor):
+        for _, ddl in _INDICES_CATALOGO:
+            cursor.execute(ddl)
+        
+        # Índice de trigramas para busca aproximada (tolerante a erros de digitação)
+        cursor.execute("PRAGMA table_info(catalogo_trigramas)")
+        if 'catalogo_id' in [coluna[1] for coluna in cursor.fetchall()]:
+            # Formato anterior (uma linha por par trigrama/id): recria no formato de listas
+            cursor.execute("DROP TABLE catalogo_trigramas")
+            cursor.execute("DROP TABLE IF EXISTS catalogo_trigramas_freq")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS catalogo_trigramas (
+                trigrama TEXT PRIMARY KEY,
+                ids BLOB NOT NULL
+            ) WITHOUT ROWID
+        """)
+        # Indexa catálogos importados antes da existência do índice
+        self._reconstruir_trigramas(cursor)
+        
+        # Índice de busca textual (FTS5, conteúdo externo nas colunas normalizadas do catálogo)
+        if self.fts_disponivel:
+            self._criar_fts(cursor)
+    
+    def _migration_metadados_midia(self, cursor):
+        # Metadados do ffprobe por arquivo; tamanho e mtime_ns invalidam a linha quando o arquivo muda
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS media_metadata (
+                caminho TEXT PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                duracao REAL,
+                fps REAL,
+                largura INTEGER,
+                altura INTEGER,
+                taxa_audio INTEGER,
+                codec_video TEXT,
+                codec_audio TEXT
+            ) WITHOUT ROWID
+        """)
+    
+    def _migration_codigos_duplicados(self, cursor):
+        cursor.execute("PRAGMA table_info(midia_arquivos)")
+        if any(coluna[1] == 'caminho' and coluna[5] for coluna in cursor.fetchall()):
+            return
+        # Formato anterior (um arquivo por código): os duplicados descartados não estão salvos,
+        # então a tabela é recriada e a próxima varredura relista todos os diretórios
+        cursor.execute("DROP TABLE midia_arquivos")
+        cursor.execute("""
+            CREATE TABLE midia_arquivos (
+                pasta_raiz TEXT NOT NULL,
+                codigo TEXT NOT NULL,
+                caminho TEXT NOT NULL,
+                diretorio TEXT NOT NULL,
+                PRIMARY KEY (pasta_raiz, codigo, caminho)
+            )
+        """)
+        cursor.execute("DELETE FROM midia_diretorios")
+    
+    def _criar_fts(self, cursor):
+        """(Re)cria a tabela FTS5 do catálogo e indexa as músicas já importadas"""
+        cursor.execute("DROP TABLE IF EXISTS catalogo_fts")
+        cursor.execute("""
+            CREATE VIRTUAL TABLE catalogo_fts USING fts5(
+                cantor_norm, musica_norm, inicio, cod,
+                content='catalogo', content_rowid='id'
+            )
+        """)
+        cursor.execute("INSERT INTO catalogo_fts(catalogo_fts) VALUES ('rebuild')")
     
     def listar_todos_eventos(self):
         """Lista todos os eventos do banco de dados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -324,12 +1134,12 @@ class KaraokeDatabase:
                 'total_musicas': row[7]
             })
         
-        conn.close()
         return eventos
     
+    @repetir_se_ocupado
     def excluir_evento(self, evento_id):
         """Exclui completamente um evento e todos os seus dados relacionados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         # Exclui na ordem correta para respeitar foreign keys
@@ -338,11 +1148,11 @@ class KaraokeDatabase:
         cursor.execute("DELETE FROM eventos WHERE id = ?", (evento_id,))
         
         conn.commit()
-        conn.close()
     
+    @repetir_se_ocupado
     def criar_evento(self, nome):
         """Cria um novo evento"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -352,13 +1162,12 @@ class KaraokeDatabase:
         
         evento_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         return evento_id
     
     def obter_evento_ativo(self):
         """Retorna o evento ativo atual"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -370,7 +1179,6 @@ class KaraokeDatabase:
         """)
         
         evento = cursor.fetchone()
-        conn.close()
         
         if evento:
             return {
@@ -381,9 +1189,10 @@ class KaraokeDatabase:
             }
         return None
     
+    @repetir_se_ocupado
     def finalizar_evento(self, evento_id):
         """Finaliza um evento"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -393,11 +1202,11 @@ class KaraokeDatabase:
         """, (datetime.now().isoformat(), evento_id))
         
         conn.commit()
-        conn.close()
     
+    @repetir_se_ocupado
     def adicionar_participante(self, evento_id, nome, avatar_path=None, ordem=None):
         """Adiciona um participante ao evento"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         if ordem is None:
@@ -414,13 +1223,12 @@ class KaraokeDatabase:
         
         participante_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         return participante_id
     
     def obter_participantes(self, evento_id):
         """Lista todos os participantes de um evento"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -440,13 +1248,12 @@ class KaraokeDatabase:
                 'ordem': row[4]
             })
         
-        conn.close()
         return participantes
      
     
     def obter_playlist(self, evento_id):
         """Obtém a playlist completa do evento"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -478,12 +1285,11 @@ class KaraokeDatabase:
                 'pontuacao_vu': row[12] if row[12] is not None else 0
             })
         
-        conn.close()
         return playlist
     
     def obter_proxima_musica(self, evento_id):
         """Obtém a próxima música não tocada da playlist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -497,7 +1303,6 @@ class KaraokeDatabase:
         """, (evento_id,))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {
@@ -512,9 +1317,10 @@ class KaraokeDatabase:
             }
         return None
     
+    @repetir_se_ocupado
     def marcar_musica_tocada(self, musica_id, tempo_cantado, pontuacao_vu=None):
         """Marca uma música como tocada, registra o tempo cantado e a pontuação do V.U. meter"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         if pontuacao_vu is not None:
@@ -543,13 +1349,12 @@ class KaraokeDatabase:
             """, (tempo_cantado, musica_id))
         
         conn.commit()
-        conn.close()
     
 
     
     def obter_ranking(self, evento_id):
         """Obtém o ranking final dos participantes com avatar"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -568,12 +1373,12 @@ class KaraokeDatabase:
                 'pontuacao': row[2]
             })
         
-        conn.close()
         return ranking
     
+    @repetir_se_ocupado
     def limpar_evento(self, evento_id):
         """Remove completamente um evento e seus dados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
         cursor.execute("DELETE FROM playlist WHERE evento_id = ?", (evento_id,))
@@ -581,4 +1386,3 @@ class KaraokeDatabase:
         cursor.execute("DELETE FROM eventos WHERE id = ?", (evento_id,))
         
         conn.commit()
-        conn.close()
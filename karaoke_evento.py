@@ -365,38 +365,17 @@ class ModoEventoWindow:
         ).pack(pady=15)
         
     def buscar_arquivo_mp4(self, codigo):
-        """Busca arquivo MP4 na pasta de músicas selecionada e subpastas"""
+        """Busca arquivo MP4 na pasta de músicas selecionada e subpastas (via índice de mídia)"""
         base_path = self.karaoke_player.music_folder
         
-        # Converte para string e remove espaços
-        codigo_str = str(codigo).strip()
-        
-        # Se for numérico e tiver menos de 5 dígitos, completa com zeros à esquerda
-        if codigo_str.isdigit() and len(codigo_str) < 5:
-            codigo_formatado = codigo_str.zfill(5)
-        else:
-            codigo_formatado = codigo_str
-        
-        arquivo_nome = f"{codigo_formatado}.mp4"
-        
         if not os.path.exists(base_path):
             messagebox.showwarning(
                 "Pasta não encontrada",
                 f"A pasta {base_path} não foi encontrada.\nVerifique se ela existe."
             )
             return None
-            
-        # Procura recursivamente
-        for root, dirs, files in os.walk(base_path):
-            for file in files:
-                # Tenta o nome formatado
-                if file.lower() == arquivo_nome.lower():
-                    return os.path.join(root, file)
-                # Tenta também o nome original (sem zeros à esquerda)
-                if codigo_formatado != codigo_str and file.lower() == f"{codigo_str}.mp4".lower():
-                    return os.path.join(root, file)
-        
-        return None
+        
+        return self.karaoke_player.media_index.buscar_arquivo(codigo)
 
     def mostrar_tela_playlist(self):
         """Tela principal da playlist do evento"""
@@ -673,13 +652,41 @@ class ModoEventoWindow:
         )
         busca_entry.pack(side=tk.LEFT, padx=5)
         
+        # Sem termo, o catálogo é carregado em páginas conforme a rolagem
+        pagina = {'chave': None, 'carregando': False}
+        
         def buscar():
             termo = busca_var.get().strip()
-            resultados = self.db.buscar_catalogo(termo) if termo else self.db.buscar_catalogo()
+            pagina['chave'] = None
+            try:
+                if termo:
+                    resultados = self.db.buscar_catalogo(termo)
+                    if not resultados:
+                        # Nenhum resultado exato: sugere músicas parecidas (tolera erros de digitação)
+                        resultados = self.db.buscar_catalogo_aproximado(termo)
+                else:
+                    resultados, pagina['chave'] = self.db.buscar_catalogo_pagina()
+            except Exception as e:
+                messagebox.showerror("Erro", f"Erro ao buscar catálogo:\n{e}", parent=dialog)
+                return
             tree.delete(*tree.get_children())
             for row in resultados:
                 tree.insert("", tk.END, values=row, tags=('item',))
         
+        def carregar_proxima_pagina():
+            if pagina['chave'] is None or pagina['carregando']:
+                return
+            pagina['carregando'] = True
+            try:
+                linhas, pagina['chave'] = self.db.buscar_catalogo_pagina(apos=pagina['chave'])
+                for row in linhas:
+                    tree.insert("", tk.END, values=row, tags=('item',))
+            except Exception as e:
+                pagina['chave'] = None
+                self.karaoke_player.debug_log(f"[CATALOGO] Erro ao carregar página: {e}")
+            finally:
+                pagina['carregando'] = False
+        
         tk.Button(
             top_frame,
             text="🔍 Buscar",
@@ -736,9 +743,15 @@ class ModoEventoWindow:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         scrollbar = tk.Scrollbar(mid_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        def on_tree_scroll(primeiro, ultimo):
+            scrollbar.set(primeiro, ultimo)
+            if float(ultimo) >= 0.95 and pagina['chave'] is not None:
+                dialog.after_idle(carregar_proxima_pagina)
+        
+        tree.configure(yscrollcommand=on_tree_scroll)
+        
         # Frame inferior - informações e controles
         bottom_frame = tk.Frame(dialog, bg="#1a1a1a")
         bottom_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -0,0 +1,259 @@
+import os
+import sys
+import time
+import threading
+from karaoke_database import KaraokeDatabase
+
+# Extensões de arquivo consideradas músicas do karaokê
+EXTENSOES_MIDIA = ('.mp4',)
+
+# Maior resolução de mtime dos sistemas de arquivos suportados (FAT/exFAT em pendrives: 2 s).
+# Um diretório listado menos de RESOLUCAO_MTIME depois da última mudança pode mudar de novo
+# sem que o mtime mude; o mtime dele é salvo como MTIME_INSTAVEL para forçar nova listagem.
+RESOLUCAO_MTIME = 2.0
+MTIME_INSTAVEL = -1.0
+
+
+def normalizar_codigo(codigo):
+    """Normaliza um código de música para a chave do índice.
+
+    Códigos numéricos são completados com zeros à esquerda até 5 dígitos,
+    assim '123', '00123' e o arquivo '00123.mp4' resultam na mesma chave.
+    """
+    codigo_str = str(codigo).strip().lower()
+    if codigo_str.isdigit():
+        return codigo_str.zfill(5)
+    return codigo_str
+
+
+def normalizar_pasta(pasta):
+    """Normaliza o caminho da pasta raiz para uso como chave no banco"""
+    return os.path.normcase(os.path.abspath(pasta))
+
+
+class MediaIndex:
+    """Índice persistente código -> arquivo de mídia da pasta de músicas.
+
+    O mapa fica salvo na tabela midia_arquivos e é mantido em memória para
+    buscas em O(1). O mtime de cada diretório é salvo em midia_diretorios, e
+    os reescaneamentos só listam novamente os diretórios que mudaram.
+
+    Com o monitoramento ativo, uma thread em segundo plano reescaneia a pasta
+    periodicamente (polling) e as buscas nunca acessam o disco na thread da UI.
+
+    Todos os arquivos ficam salvos; se dois tiverem o mesmo código normalizado
+    (ex.: 123.mp4 e 00123.mp4), vale o de menor caminho e os demais são
+    informados no log e nas estatísticas da varredura.
+    """
+
+    INTERVALO_MONITORAMENTO = 5.0  # segundos entre varreduras
+
+    def __init__(self, music_folder, db=None, log=print):
+        self.db = db or KaraokeDatabase()
+        self.log = log
+        self.music_folder = music_folder
+        self._arquivos = None  # {codigo: caminho}, carregado sob demanda
+        self._duplicados = None  # {codigo: [caminhos]} da última varredura
+        self._lock = threading.Lock()  # protege a troca de pasta/mapa em memória
+        self._varredura_lock = threading.RLock()  # serializa as varreduras
+        self._monitor_thread = None
+        self._monitor_parar = threading.Event()
+        self._monitor_acordar = threading.Event()
+
+    def definir_pasta(self, music_folder):
+        """Troca a pasta de músicas; o índice da nova pasta é carregado sob demanda"""
+        with self._lock:
+            self.music_folder = music_folder
+            self._arquivos = None
+            self._duplicados = None
+        self.agendar_atualizacao()
+
+    def carregar(self):
+        """Carrega o índice salvo no banco e retorna o mapa {codigo: caminho}.
+
+        Se a pasta nunca foi varrida (banco novo ou pasta trocada), a primeira
+        varredura é feita aqui mesmo, com o monitoramento ligado ou não: sem
+        ela as músicas existentes apareceriam como sem arquivo até a thread de
+        monitoramento terminar. Se essa thread já estiver varrendo, espera por
+        ela e a varredura daqui só confere os diretórios.
+        """
+        arquivos = self._arquivos
+        if arquivos is not None:
+            return arquivos
+
+        pasta = self.music_folder
+        pasta_raiz = normalizar_pasta(pasta)
+        if not self.db.carregar_diretorios_midia(pasta_raiz):
+            self.atualizar()
+            return self._arquivos or {}
+
+        arquivos = self.db.carregar_indice_midia(pasta_raiz)
+        with self._lock:
+            if self._arquivos is None and pasta == self.music_folder:
+                self._arquivos = arquivos
+        return arquivos
+
+    def reconstruir(self):
+        """Descarta o índice salvo e varre toda a pasta de músicas. Retorna o número de arquivos indexados."""
+        with self._varredura_lock:
+            self.db.limpar_indice_midia(normalizar_pasta(self.music_folder))
+            return self.atualizar()['arquivos']
+
+    def atualizar(self, silencioso=False):
+        """Reescaneia a pasta listando apenas os diretórios cujo mtime mudou.
+
+        Diretórios inalterados não são listados: seus subdiretórios conhecidos
+        vêm do estado salvo. Um diretório com mtime recente demais (dentro de
+        RESOLUCAO_MTIME) é listado de novo na varredura seguinte. Retorna um dicionário com as estatísticas; com
+        silencioso=True só registra no log quando algo mudou.
+        """
+        with self._varredura_lock:
+            inicio = time.perf_counter()
+            pasta = self.music_folder
+            pasta_raiz = normalizar_pasta(pasta)
+            salvos = self.db.carregar_diretorios_midia(pasta_raiz)
+
+            filhos = {}
+            for diretorio, (pai, _, _) in salvos.items():
+                if pai is not None:
+                    filhos.setdefault(pai, []).append(diretorio)
+
+            visitados = set()
+            relistados = {}
+            ignorados = 0
+            pilha = [(pasta, None)] if os.path.isdir(pasta) else []
+
+            while pilha:
+                diretorio, pai = pilha.pop()
+                try:
+                    mtime = os.stat(diretorio).st_mtime
+                except OSError:
+                    continue
+                visitados.add(diretorio)
+
+                salvo = salvos.get(diretorio)
+                if salvo is not None and salvo[1] == mtime:
+                    ignorados += 1
+                    pilha.extend((filho, diretorio) for filho in filhos.get(diretorio, []))
+                    continue
+
+                arquivos = []
+                listado_em = time.time()
+                try:
+                    with os.scandir(diretorio) as entradas:
+                        for entrada in entradas:
+                            if entrada.is_dir(follow_symlinks=False):
+                                pilha.append((entrada.path, diretorio))
+                                continue
+                            nome, ext = os.path.splitext(entrada.name)
+                            if ext.lower() in EXTENSOES_MIDIA:
+                                arquivos.append((normalizar_codigo(nome), entrada.path))
+                except OSError as e:
+                    self.log(f"[INDICE] ⚠️ Não foi possível listar {diretorio}: {e}")
+                    continue
+                if listado_em - mtime < RESOLUCAO_MTIME:
+                    # Mudança no mesmo "tique" do mtime não seria percebida: não confia no mtime
+                    mtime = MTIME_INSTAVEL
+                relistados[diretorio] = (pai, mtime, arquivos)
+
+            removidos = [d for d in salvos if d not in visitados]
+            arquivos_indice, duplicados = self._arquivos, self._duplicados
+            if relistados or removidos:
+                self.db.atualizar_diretorios_midia(pasta_raiz, relistados, removidos)
+                arquivos_indice = duplicados = None
+            if arquivos_indice is None:
+                arquivos_indice = self.db.carregar_indice_midia(pasta_raiz)
+            if duplicados is None:
+                duplicados = self.db.listar_codigos_duplicados(pasta_raiz)
+                for codigo, caminhos in duplicados.items():
+                    self.log(f"[INDICE] ⚠️ Código {codigo} em {len(caminhos)} arquivos: usando {caminhos[0]}, "
+                             f"ignorando {', '.join(caminhos[1:])}")
+
+            with self._lock:
+                if pasta == self.music_folder:
+                    self._arquivos = arquivos_indice
+                    self._duplicados = duplicados
+
+            estatisticas = {
+                'diretorios_ignorados': ignorados,
+                'diretorios_relistados': len(relistados),
+                'diretorios_removidos': len(removidos),
+                'arquivos': len(arquivos_indice),
+                'codigos_duplicados': len(duplicados),
+                'tempo': time.perf_counter() - inicio,
+            }
+            if not silencioso or relistados or removidos:
+                self.log(f"[INDICE] Varredura de {pasta}: "
+                         f"{estatisticas['diretorios_ignorados']} diretórios inalterados, "
+                         f"{estatisticas['diretorios_relistados']} relistados, "
+                         f"{estatisticas['diretorios_removidos']} removidos, "
+                         f"{estatisticas['arquivos']} arquivos "
+                         f"({estatisticas['codigos_duplicados']} códigos duplicados) em {estatisticas['tempo']:.2f}s")
+            return estatisticas
+
+    def iniciar_monitoramento(self, intervalo=None):
+        """Inicia a thread que mantém o índice sincronizado com a pasta de músicas"""
+        if self.monitorando():
+            return
+        intervalo = intervalo or self.INTERVALO_MONITORAMENTO
+        self._monitor_parar.clear()
+        self._monitor_thread = threading.Thread(target=self._monitorar, args=(intervalo,), daemon=True)
+        self._monitor_thread.start()
+        self.log(f"[INDICE] Monitoramento da pasta iniciado (a cada {intervalo:g}s)")
+
+    def parar_monitoramento(self):
+        """Para a thread de monitoramento"""
+        if not self.monitorando():
+            return
+        self._monitor_parar.set()
+        self._monitor_acordar.set()
+        self._monitor_thread.join(timeout=2)
+        self._monitor_thread = None
+
+    def monitorando(self):
+        return self._monitor_thread is not None and self._monitor_thread.is_alive()
+
+    def agendar_atualizacao(self):
+        """Pede à thread de monitoramento uma varredura imediata (ex.: após um download)"""
+        self._monitor_acordar.set()
+
+    def _monitorar(self, intervalo):
+        while not self._monitor_parar.is_set():
+            try:
+                self.atualizar(silencioso=True)
+            except Exception as e:
+                self.log(f"[INDICE] ⚠️ Erro no monitoramento da pasta: {e}")
+            self._monitor_acordar.wait(intervalo)
+            self._monitor_acordar.clear()
+
+    def buscar_arquivo(self, codigo):
+        """Retorna o caminho do arquivo de mídia do código informado, ou None"""
+        caminho = self.carregar().get(normalizar_codigo(codigo))
+        if caminho and not os.path.exists(caminho):
+            # Arquivo removido desde a última indexação
+            return None
+        return caminho
+
+    def codigos_sem_arquivo(self):
+        """Lista os códigos do catálogo que não possuem arquivo correspondente na pasta"""
+        arquivos = self.carregar()
+        return [cod for cod in self.db.listar_codigos_catalogo()
+                if normalizar_codigo(cod) not in arquivos]
+
+    def total_arquivos(self):
+        """Número de arquivos indexados"""
+        return len(self.carregar())
+
+
+if __name__ == "__main__":
+    # Uso: python karaoke_media_index.py PASTA_MUSICAS [BANCO]
+    if len(sys.argv) < 2:
+        print("Uso: python karaoke_media_index.py PASTA_MUSICAS [BANCO]")
+        sys.exit(1)
+
+    db = KaraokeDatabase(sys.argv[2]) if len(sys.argv) > 2 else KaraokeDatabase()
+    indice = MediaIndex(sys.argv[1], db=db)
+    total = indice.reconstruir()
+    faltando = indice.codigos_sem_arquivo()
+    print(f"Arquivos indexados: {total}")
+    print(f"Códigos do catálogo sem arquivo: {len(faltando)}")
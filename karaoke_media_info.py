@@ -0,0 +1,367 @@
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import sqlite3
+import threading
+import subprocess
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from karaoke_database import KaraokeDatabase
+
+# Resultado das sondagens já feitas neste processo: {(caminho, tamanho, mtime): MediaInfo}
+_sondagens = {}
+_sondagens_lock = threading.Lock()
+_banco_padrao = None
+
+TAMANHO_LOTE_METADADOS = 50  # sondagens gravadas por transação na sondagem em massa
+
+# Formato da entrada do stsd (MP4) -> nome do codec como o ffprobe informa
+_CODECS_MP4 = {
+    b'avc1': 'h264', b'avc3': 'h264', b'hvc1': 'hevc', b'hev1': 'hevc', b'av01': 'av1',
+    b'vp09': 'vp9', b'mp4v': 'mpeg4', b'mp4a': 'aac', b'.mp3': 'mp3', b'ac-3': 'ac3',
+    b'ec-3': 'eac3', b'Opus': 'opus', b'fLaC': 'flac', b'alac': 'alac',
+}
+# objectTypeIndication do esds de faixas mp4a que não são AAC
+_CODECS_MP4A = {0x69: 'mp3', 0x6B: 'mp3'}
+
+
+class MediaInfo:
+    """Metadados de um arquivo de mídia, como retornados por sondar_midia.
+
+    Uma instância por arquivo é compartilhada por todos que sondam o mesmo
+    arquivo (e pode ser enviada ao player no comando 'load'): não altere.
+    """
+
+    __slots__ = ('duration', 'fps', 'width', 'height', 'sample_rate', 'video_codec', 'audio_codec')
+
+    def __init__(self, duration, fps=30.0, width=0, height=0, sample_rate=0, video_codec=None, audio_codec=None):
+        self.duration = duration
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.sample_rate = sample_rate
+        self.video_codec = video_codec
+        self.audio_codec = audio_codec
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria a partir de um dicionário com os nomes dos campos (ex.: linha da media_metadata)"""
+        return cls(**{campo: dados[campo] for campo in cls.__slots__ if campo in dados})
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __eq__(self, outro):
+        return isinstance(outro, MediaInfo) and self.como_dict() == outro.como_dict()
+
+    def __repr__(self):
+        return f"MediaInfo({', '.join(f'{campo}={getattr(self, campo)!r}' for campo in self.__slots__)})"
+
+
+def fps_de_fracao(texto, padrao=30.0):
+    """Converte o r_frame_rate do ffprobe ("30000/1001", "25/1", "25") em float, sem eval"""
+    try:
+        fps = float(Fraction(str(texto)))
+    except (ValueError, ZeroDivisionError):
+        return padrao
+    return fps if fps > 0 else padrao
+
+
+def _caixas(dados, inicio, fim):
+    """Percorre as caixas ISO-BMFF em dados[inicio:fim], gerando (tipo, início do conteúdo, fim)"""
+    while inicio + 8 <= fim:
+        tamanho, tipo = struct.unpack_from('>I4s', dados, inicio)
+        cabecalho = 8
+        if tamanho == 1:
+            tamanho = struct.unpack_from('>Q', dados, inicio + 8)[0]
+            cabecalho = 16
+        elif tamanho == 0:
+            tamanho = fim - inicio  # vai até o fim do arquivo
+        if tamanho < cabecalho or inicio + tamanho > fim:
+            raise ValueError(f"Caixa {tipo!r} inválida em {inicio}")
+        yield tipo, inicio + cabecalho, inicio + tamanho
+        inicio += tamanho
+
+
+def _caixa(dados, inicio, fim, *caminho):
+    """Procura a caixa pelo caminho de tipos (ex.: b'mdia', b'hdlr'); retorna (início, fim) ou None"""
+    for tipo_procurado in caminho:
+        for tipo, conteudo, final in _caixas(dados, inicio, fim):
+            if tipo == tipo_procurado:
+                inicio, fim = conteudo, final
+                break
+        else:
+            return None
+    return inicio, fim
+
+
+def _escala_e_duracao(dados, inicio):
+    """Lê timescale e duration de um mvhd/mdhd (versão 0 ou 1)"""
+    if dados[inicio] == 1:
+        return struct.unpack_from('>IQ', dados, inicio + 20)
+    return struct.unpack_from('>II', dados, inicio + 12)
+
+
+def _codec_mp4a(dados, inicio, fim):
+    """Codec de uma entrada mp4a a partir do objectTypeIndication do esds (AAC se ausente)"""
+    versao = struct.unpack_from('>H', dados, inicio + 8)[0]
+    esds = _caixa(dados, inicio + 28 + {1: 16, 2: 36}.get(versao, 0), fim, b'esds')
+    if esds is None:
+        return 'aac'
+    posicao = esds[0] + 4
+    while posicao < esds[1]:
+        tag = dados[posicao]
+        posicao += 1
+        for _ in range(4):  # tamanho do descritor: até 4 bytes com bit de continuação
+            byte = dados[posicao]
+            posicao += 1
+            if not byte & 0x80:
+                break
+        if tag == 0x03:
+            flags = dados[posicao + 2]
+            posicao += 3
+            if flags & 0x80:
+                posicao += 2
+            if flags & 0x40:
+                posicao += 1 + dados[posicao]
+            if flags & 0x20:
+                posicao += 2
+        elif tag == 0x04:
+            return _CODECS_MP4A.get(dados[posicao], 'aac')
+        else:
+            break
+    return 'aac'
+
+
+def ler_metadados_mp4(video_file):
+    """Lê os metadados direto das caixas moov/mvhd/tkhd/stsd de um MP4, sem o ffprobe.
+
+    O arquivo é mapeado em memória e só os cabeçalhos são lidos (o mdat é
+    pulado). Retorna o mesmo MediaInfo de executar_ffprobe, ou None se o
+    arquivo não for um MP4/MOV que este leitor entenda (ex.: MKV, MP4
+    fragmentado ou corrompido); nesse caso use o ffprobe. Erros de acesso
+    ao arquivo (OSError) são repassados a quem chamou.
+    """
+    try:
+        with open(video_file, 'rb') as arquivo, \
+                mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            return _ler_moov(dados)
+    except (ValueError, IndexError, struct.error):
+        return None
+
+
+def _ler_moov(dados):
+    moov = _caixa(dados, 0, len(dados), b'moov')
+    mvhd = moov and _caixa(dados, *moov, b'mvhd')
+    if mvhd is None:
+        return None
+    escala, duracao = _escala_e_duracao(dados, mvhd[0])
+    if not escala or not duracao:
+        return None
+
+    info = {'duration': duracao / escala, 'fps': 30.0, 'width': 0, 'height': 0,
+            'sample_rate': 0, 'video_codec': None, 'audio_codec': None}
+    for tipo, inicio, fim in _caixas(dados, *moov):
+        if tipo != b'trak':
+            continue
+        hdlr = _caixa(dados, inicio, fim, b'mdia', b'hdlr')
+        mdhd = _caixa(dados, inicio, fim, b'mdia', b'mdhd')
+        stbl = _caixa(dados, inicio, fim, b'mdia', b'minf', b'stbl')
+        stsd = stbl and _caixa(dados, *stbl, b'stsd')
+        if hdlr is None or mdhd is None or stsd is None:
+            continue
+        manipulador = dados[hdlr[0] + 8:hdlr[0] + 12]
+        escala_faixa = _escala_e_duracao(dados, mdhd[0])[0]
+        # Primeira entrada do stsd (depois de versão/flags e número de entradas)
+        formato, entrada, fim_entrada = next(_caixas(dados, stsd[0] + 8, stsd[1]), (None, 0, 0))
+
+        if manipulador == b'vide' and info['video_codec'] is None and formato:
+            info['video_codec'] = _CODECS_MP4.get(formato, formato.decode('latin-1').strip())
+            info['width'], info['height'] = struct.unpack_from('>HH', dados, entrada + 24)
+            if not info['width'] or not info['height']:
+                tkhd = _caixa(dados, inicio, fim, b'tkhd')
+                if tkhd:
+                    # Largura/altura em ponto fixo 16.16 no fim do tkhd
+                    largura, altura = struct.unpack_from('>II', dados, tkhd[1] - 8)
+                    info['width'], info['height'] = largura >> 16, altura >> 16
+            stts = _caixa(dados, *stbl, b'stts')
+            if stts and escala_faixa:
+                entradas = struct.unpack_from('>I', dados, stts[0] + 4)[0]
+                # Duração de quadro mais frequente (como o r_frame_rate de vídeos com fps constante)
+                amostras, delta = max((struct.unpack_from('>II', dados, stts[0] + 8 + 8 * i)
+                                       for i in range(min(entradas, 1000))), default=(0, 0))
+                if delta:
+                    info['fps'] = fps_de_fracao(Fraction(escala_faixa, delta))
+        elif manipulador == b'soun' and info['audio_codec'] is None and formato:
+            info['audio_codec'] = (_codec_mp4a(dados, entrada, fim_entrada) if formato == b'mp4a'
+                                   else _CODECS_MP4.get(formato, formato.decode('latin-1').strip()))
+            taxa = struct.unpack_from('>I', dados, entrada + 24)[0] >> 16
+            # QuickTime v2 guarda a taxa em outro campo: usa o timescale da faixa
+            info['sample_rate'] = taxa if taxa > 1 else escala_faixa
+    return MediaInfo(**info)
+
+
+def extrair_metadados(video_file):
+    """Metadados do arquivo: leitor de MP4 em processo e, se ele não entender o arquivo, o ffprobe"""
+    return ler_metadados_mp4(video_file) or executar_ffprobe(video_file)
+
+
+def _banco():
+    global _banco_padrao
+    if _banco_padrao is None:
+        _banco_padrao = KaraokeDatabase()
+    return _banco_padrao
+
+
+def executar_ffprobe(video_file):
+    """Roda o ffprobe no arquivo e retorna o MediaInfo (FileNotFoundError se o ffprobe não estiver instalado)"""
+    try:
+        result = subprocess.run([
+            'ffprobe', '-v', 'quiet', '-print_format', 'json',
+            '-show_format', '-show_streams', video_file
+        ], capture_output=True, text=True, check=True,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"ffprobe não encontrado, necessário para ler {os.path.basename(video_file)}") from e
+
+    dados = json.loads(result.stdout)
+    info = {'duration': float(dados['format']['duration']), 'fps': 30.0, 'width': 0, 'height': 0,
+            'sample_rate': 0, 'video_codec': None, 'audio_codec': None}
+    for stream in dados['streams']:
+        if stream['codec_type'] == 'video' and info['video_codec'] is None:
+            info['fps'] = fps_de_fracao(stream.get('r_frame_rate', '30/1'))
+            info['width'] = stream['width']
+            info['height'] = stream['height']
+            info['video_codec'] = stream.get('codec_name')
+        elif stream['codec_type'] == 'audio' and info['audio_codec'] is None:
+            info['sample_rate'] = int(stream.get('sample_rate') or 0)
+            info['audio_codec'] = stream.get('codec_name')
+    return MediaInfo(**info)
+
+
+def sondar_midia(video_file, db=None):
+    """Lê duração, fps, resolução e dados do áudio do vídeo.
+
+    Retorna um MediaInfo (duration, fps, width, height, sample_rate,
+    video_codec e audio_codec). O resultado fica em memória
+    e na tabela media_metadata do banco (db, ou o banco padrão) por
+    (caminho, tamanho, mtime): o arquivo só é lido na primeira vez que é
+    visto, ou depois que muda, e o ffprobe só roda para o que o leitor de
+    MP4 não entende. Levanta FileNotFoundError se o ffprobe for necessário e
+    não for encontrado, e OSError se o vídeo não existir.
+    """
+    try:
+        st = os.stat(video_file)
+    except OSError as e:
+        raise OSError(f"Vídeo não encontrado: {video_file}") from e
+    caminho = os.path.abspath(video_file)
+    chave = (caminho, st.st_size, st.st_mtime_ns)
+    with _sondagens_lock:
+        info = _sondagens.get(chave)
+    if info is not None:
+        return info
+
+    db = db or _banco()
+    try:
+        salvo = db.obter_metadados_midia(*chave)
+    except sqlite3.Error as e:
+        print(f"⚠️ Erro ao ler metadados salvos de {video_file}: {e}")
+        salvo = None
+    if salvo is not None:
+        info = MediaInfo.de_dict(salvo)
+    else:
+        info = extrair_metadados(video_file)
+        try:
+            db.salvar_metadados_midia(*chave, info.como_dict())
+        except sqlite3.Error as e:
+            print(f"⚠️ Erro ao salvar metadados de {video_file}: {e}")
+
+    with _sondagens_lock:
+        info = _sondagens.setdefault(chave, info)
+    return info
+
+
+def sondar_biblioteca(caminhos, db=None, max_workers=None, tamanho_lote=None, progresso=None, log=print):
+    """Sonda em paralelo todos os arquivos que ainda não estão na tabela media_metadata.
+
+    Arquivos já sondados (mesmo tamanho e mtime) são pulados, então uma
+    execução interrompida continua de onde parou: no máximo o lote em curso
+    é perdido. Os ffprobe rodam num pool limitado de threads e os resultados
+    são gravados em lotes de tamanho_lote por transação. progresso(feitos,
+    total) é chamada a cada arquivo. Um arquivo que não pode ser lido, ou
+    que precisaria do ffprobe quando ele não está instalado, conta como erro
+    e a sondagem continua (MP4 é lido sem o ffprobe). Retorna {'sondados',
+    'ja_sondados', 'erros'}.
+    """
+    db = db or _banco()
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_METADADOS
+
+    salvos = db.carregar_assinaturas_metadados()
+    estatisticas = {'sondados': 0, 'ja_sondados': 0, 'erros': 0}
+    pendentes = []
+    for caminho in caminhos:
+        caminho = os.path.abspath(caminho)
+        try:
+            st = os.stat(caminho)
+        except OSError:
+            continue  # removido desde a indexação
+        if salvos.get(caminho) == (st.st_size, st.st_mtime_ns):
+            estatisticas['ja_sondados'] += 1
+        else:
+            pendentes.append((caminho, st.st_size, st.st_mtime_ns))
+
+    lote = []
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ffprobe")
+    try:
+        futuros = {executor.submit(extrair_metadados, caminho): (caminho, tamanho, mtime_ns)
+                   for caminho, tamanho, mtime_ns in pendentes}
+        for feitos, futuro in enumerate(as_completed(futuros), 1):
+            caminho, tamanho, mtime_ns = futuros[futuro]
+            try:
+                lote.append((caminho, tamanho, mtime_ns, futuro.result().como_dict()))
+                estatisticas['sondados'] += 1
+            except Exception as e:  # inclui OSError: arquivo removido, sem permissão ou ffprobe ausente
+                estatisticas['erros'] += 1
+                log(f"[METADADOS] ⚠️ Erro ao sondar {caminho}: {e}")
+            if len(lote) >= tamanho_lote:
+                db.salvar_metadados_midia_lote(lote)
+                lote = []
+            if progresso:
+                progresso(feitos, len(pendentes))
+    finally:
+        # Interrompido (Ctrl+C) ou não: cancela o que não começou e grava o que já foi sondado
+        executor.shutdown(wait=True, cancel_futures=True)
+        if lote:
+            db.salvar_metadados_midia_lote(lote)
+    return estatisticas
+
+
+if __name__ == "__main__":
+    # Uso: python karaoke_media_info.py PASTA_MUSICAS [BANCO] [THREADS]
+    if len(sys.argv) < 2:
+        print("Uso: python karaoke_media_info.py PASTA_MUSICAS [BANCO] [THREADS]")
+        sys.exit(1)
+
+    from karaoke_media_index import MediaIndex
+
+    db = KaraokeDatabase(sys.argv[2]) if len(sys.argv) > 2 else KaraokeDatabase()
+    arquivos = MediaIndex(sys.argv[1], db=db).carregar()
+    inicio = time.perf_counter()
+
+    def mostrar_progresso(feitos, total):
+        if feitos == total or feitos % 10 == 0:
+            print(f"\r[METADADOS] {feitos}/{total} arquivos sondados", end="", flush=True)
+
+    try:
+        resultado = sondar_biblioteca(list(arquivos.values()), db=db,
+                                      max_workers=int(sys.argv[3]) if len(sys.argv) > 3 else None,
+                                      progresso=mostrar_progresso)
+    except KeyboardInterrupt:
+        print("\n[METADADOS] Interrompido: rode novamente para continuar de onde parou")
+        sys.exit(1)
+    print(f"\n[METADADOS] {resultado['sondados']} sondados, {resultado['ja_sondados']} já sondados, "
+          f"{resultado['erros']} erros em {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,425 @@
+import os
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from karaoke_media_info import sondar_midia
+
+# Muda sempre que o filtro ou os parâmetros de codificação mudarem: as versões
+# antigas deixam de ser encontradas e acabam removidas pela política LRU.
+VERSAO_FILTRO = 2
+
+PASTA_CACHE_PADRAO = "cache_tom"
+TAMANHO_MAXIMO_PADRAO = 5 * 1024 ** 3  # 5 GB
+
+# Trechos do início e do fim do arquivo usados na impressão digital do conteúdo
+_TAMANHO_AMOSTRA = 1024 * 1024
+
+# Geração em paralelo: segmentos de pelo menos SEGMENTO_MINIMO segundos, emendados
+# com SOBREPOSICAO segundos de crossfade
+SEGMENTO_MINIMO = 15.0
+SOBREPOSICAO = 0.5
+
+
+def filtro_pitch(semitons):
+    """Filtro de áudio do ffmpeg que muda o tom em semitons mantendo a duração"""
+    ratio = 2 ** (semitons / 12.0)
+    tempo = 1.0 / ratio
+    if 0.5 <= tempo <= 2.0:
+        return f'asetrate=44100*{ratio},aresample=44100,atempo={tempo}'
+    return f'asetrate=44100*{ratio},aresample=44100'
+
+
+def executar_ffmpeg(comando, baixa_prioridade=False):
+    """Roda o ffmpeg sem janela; com baixa_prioridade, abaixo da prioridade normal do sistema"""
+    creationflags = 0
+    if os.name == 'nt':
+        creationflags = subprocess.CREATE_NO_WINDOW
+        if baixa_prioridade:
+            creationflags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    elif baixa_prioridade and shutil.which('nice'):
+        comando = ['nice', '-n', '10'] + comando
+    subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+                   creationflags=creationflags)
+
+
+def extrair_audio(video_file, destino, baixa_prioridade=False):
+    """Extrai a faixa de áudio do vídeo para FLAC em 44,1 kHz (a taxa que o filtro de tom assume)"""
+    executar_ffmpeg([
+        'ffmpeg', '-y', '-i', video_file,
+        '-map', '0:a:0', '-vn', '-ar', '44100', '-c:a', 'flac',
+        '-f', 'flac', destino
+    ], baixa_prioridade)
+
+
+def renderizar_pitch(audio_original, semitons, destino, baixa_prioridade=False):
+    """Gera em destino só a faixa de áudio (AAC) no tom pedido, a partir do áudio extraído"""
+    executar_ffmpeg([
+        'ffmpeg', '-y', '-i', audio_original,
+        '-af', filtro_pitch(semitons),
+        '-c:a', 'aac', '-b:a', '192k',
+        '-f', 'mp4', destino
+    ], baixa_prioridade)
+
+
+def dividir_segmentos(duracao, partes):
+    """Divide a música em até `partes` trechos [(início, duração)] que se sobrepõem em SOBREPOSICAO.
+
+    O último trecho vai até o fim do arquivo (duração None).
+    """
+    partes = max(1, min(partes, int(duracao // SEGMENTO_MINIMO)))
+    passo = duracao / partes
+    return [(i * passo, passo + SOBREPOSICAO if i < partes - 1 else None) for i in range(partes)]
+
+
+def _renderizar_segmento(audio_original, semitons, inicio, duracao, destino):
+    comando = ['ffmpeg', '-y', '-ss', f'{inicio:.6f}']
+    if duracao is not None:
+        comando += ['-t', f'{duracao:.6f}']
+    comando += ['-i', audio_original, '-af', filtro_pitch(semitons),
+                '-c:a', 'pcm_f32le', '-f', 'wav', destino]
+    executar_ffmpeg(comando)
+
+
+def renderizar_pitch_paralelo(audio_original, semitons, destino, duracao, processos=None):
+    """Como renderizar_pitch, mas dividindo a música entre vários ffmpeg em paralelo.
+
+    Cada trecho (ver dividir_segmentos) tem o tom alterado por um ffmpeg
+    próprio, um por núcleo; os trechos são emendados com crossfade e
+    codificados em AAC numa última chamada. Músicas curtas, uma CPU só ou
+    tons fora de uma oitava (em que o filtro muda a duração) usam a
+    chamada única.
+    """
+    processos = processos or os.cpu_count() or 1
+    segmentos = dividir_segmentos(duracao, processos) if duracao else [(0.0, None)]
+    if len(segmentos) == 1 or not 0.5 <= 2 ** (-semitons / 12.0) <= 2.0:
+        renderizar_pitch(audio_original, semitons, destino)
+        return
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(destino) or None) as pasta:
+        trechos = [os.path.join(pasta, f"{i:03d}.wav") for i in range(len(segmentos))]
+        # O trabalho pesado fica nos processos do ffmpeg; as threads só os aguardam
+        with ThreadPoolExecutor(max_workers=min(processos, len(segmentos))) as executor:
+            for futuro in [executor.submit(_renderizar_segmento, audio_original, semitons, inicio, dur, trecho)
+                           for (inicio, dur), trecho in zip(segmentos, trechos)]:
+                futuro.result()
+
+        entradas = []
+        for trecho in trechos:
+            entradas += ['-i', trecho]
+        filtros = []
+        anterior = '[0:a]'
+        for i in range(1, len(trechos)):
+            saida = f'[x{i}]' if i < len(trechos) - 1 else '[saida]'
+            # c1/c2=tri: os trechos são o mesmo áudio, então o crossfade linear mantém o volume
+            filtros.append(f'{anterior}[{i}:a]acrossfade=d={SOBREPOSICAO}:c1=tri:c2=tri{saida}')
+            anterior = saida
+        executar_ffmpeg([
+            'ffmpeg', '-y', *entradas,
+            '-filter_complex', ';'.join(filtros), '-map', '[saida]',
+            '-c:a', 'aac', '-b:a', '192k',
+            '-f', 'mp4', destino
+        ])
+
+
+def iniciar_pitch_progressivo(origem, semitons, destino):
+    """Inicia o ffmpeg que gera a faixa no tom pedido e, ao mesmo tempo, envia o mesmo
+    áudio em PCM (float32, estéreo, 44,1 kHz) pelo stdout, em ordem de tempo.
+
+    Retorna o subprocess.Popen; destino só fica completo quando o processo termina.
+    """
+    filtro = f'aresample=44100,{filtro_pitch(semitons)}'
+    return subprocess.Popen([
+        'ffmpeg', '-y', '-v', 'quiet', '-i', origem,
+        '-map', '0:a:0', '-vn', '-af', filtro,
+        '-c:a', 'aac', '-b:a', '192k', '-f', 'mp4', destino,
+        '-map', '0:a:0', '-vn', '-af', filtro,
+        '-ac', '2', '-f', 'f32le', 'pipe:1'
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+
+
+class RenderizacaoProgressiva:
+    """Geração de uma faixa do cache cujo áudio pode ser tocado enquanto é gerado.
+
+    processo.stdout entrega o PCM já no tom pedido; finalizar() move o arquivo
+    gerado para o cache se o ffmpeg terminou com sucesso (ou o descarta).
+    """
+
+    def __init__(self, cache, video_file, semitons, destino, processo, temporario, evento):
+        self.cache = cache
+        self.video_file = video_file
+        self.semitons = semitons
+        self.destino = destino
+        self.processo = processo
+        self._temporario = temporario
+        self._evento = evento
+        self._inicio = time.perf_counter()
+        self._finalizada = False
+        self._lock = threading.Lock()
+
+    def finalizar(self, concluido=True):
+        """Encerra a geração; com concluido=False (ex.: música interrompida) descarta o arquivo"""
+        with self._lock:
+            if self._finalizada:
+                return
+            self._finalizada = True
+        if not concluido and self.processo.poll() is None:
+            self.processo.kill()
+        sucesso = self.processo.wait() == 0 and concluido
+        try:
+            if sucesso:
+                os.replace(self._temporario, self.destino)
+                self.cache.log(f"[TOM] {os.path.basename(self.video_file)} ({self.semitons:+d}) "
+                               f"gerado durante a reprodução em {time.perf_counter() - self._inicio:.1f}s")
+        finally:
+            if os.path.exists(self._temporario):
+                os.unlink(self._temporario)
+            self.cache._concluir_geracao(self.destino, self._evento)
+        if sucesso:
+            self.cache.limpar_excedente(manter=(self.destino,))
+
+
+def anexar_audio_tom(media, audio_tom):
+    """Anexa a faixa com o tom alterado à mídia do VLC como áudio secundário (input-slave)"""
+    uri = Path(os.path.abspath(audio_tom)).as_uri()
+    try:
+        import vlc
+        media.slaves_add(vlc.MediaSlaveType.audio, 4, uri)
+    except (ImportError, AttributeError):
+        media.add_option(f':input-slave={uri}')
+
+
+def selecionar_audio_tom(player):
+    """Seleciona no player a faixa de áudio anexada (a última da lista, depois das do vídeo).
+
+    Retorna False se as faixas ainda não estiverem disponíveis (player iniciando).
+    """
+    faixas = [faixa[0] for faixa in (player.audio_get_track_description() or []) if faixa[0] != -1]
+    if len(faixas) < 2:
+        return False
+    if player.audio_get_track() != faixas[-1]:
+        player.audio_set_track(faixas[-1])
+    return True
+
+
+class PitchCache:
+    """Cache em disco das faixas de áudio de uma música com o tom alterado.
+
+    O vídeo nunca é regravado: o áudio é extraído uma vez para FLAC e cada tom
+    gera só uma faixa AAC de poucos MB, tocada junto com o vídeo original como
+    áudio secundário do VLC (anexar_audio_tom/selecionar_audio_tom).
+
+    Os arquivos são endereçados pelo conteúdo do vídeo original (tamanho e
+    amostras do início e do fim), pelo número de semitons e por VERSAO_FILTRO,
+    então renomear ou mover a música não invalida o cache. O tamanho total é
+    limitado: ao passar do limite, os arquivos usados há mais tempo (mtime,
+    atualizado a cada acesso) são removidos.
+    """
+
+    def __init__(self, pasta=PASTA_CACHE_PADRAO, tamanho_maximo=TAMANHO_MAXIMO_PADRAO, log=print):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self.log = log
+        self._lock = threading.Lock()
+        self._impressoes = {}  # {(caminho, tamanho, mtime): impressão digital do conteúdo}
+        self._em_andamento = {}  # {chave: threading.Event} das renderizações em curso
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def impressao_digital(self, video_file):
+        """Hash do conteúdo do arquivo, calculado uma vez por (caminho, tamanho, mtime)"""
+        st = os.stat(video_file)
+        identidade = (os.path.abspath(video_file), st.st_size, st.st_mtime_ns)
+        impressao = self._impressoes.get(identidade)
+        if impressao is None:
+            h = hashlib.blake2b(str(st.st_size).encode(), digest_size=16)
+            with open(video_file, 'rb') as f:
+                h.update(f.read(_TAMANHO_AMOSTRA))
+                if st.st_size > 2 * _TAMANHO_AMOSTRA:
+                    f.seek(-_TAMANHO_AMOSTRA, os.SEEK_END)
+                    h.update(f.read(_TAMANHO_AMOSTRA))
+            impressao = self._impressoes[identidade] = h.hexdigest()
+        return impressao
+
+    def caminho(self, video_file, semitons):
+        """Caminho da faixa no tom pedido dentro do cache (existindo ou não)"""
+        nome = f"{self.impressao_digital(video_file)}_{semitons:+d}_v{VERSAO_FILTRO}.m4a"
+        return os.path.join(self.pasta, nome)
+
+    def caminho_audio_original(self, video_file):
+        """Caminho do áudio extraído (FLAC) dentro do cache (existindo ou não)"""
+        nome = f"{self.impressao_digital(video_file)}_original_v{VERSAO_FILTRO}.flac"
+        return os.path.join(self.pasta, nome)
+
+    @staticmethod
+    def _marcar_uso(caminho):
+        """Retorna o caminho se existir, marcando-o como usado recentemente (LRU)"""
+        if not os.path.exists(caminho):
+            return None
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+        return caminho
+
+    def obter(self, video_file, semitons):
+        """Retorna o caminho da faixa já gerada, ou None (também se o vídeo foi removido ou movido)"""
+        try:
+            destino = self.caminho(video_file, semitons)
+        except OSError:
+            return None
+        return self._marcar_uso(destino)
+
+    def obter_ou_gerar(self, video_file, semitons, baixa_prioridade=False):
+        """Retorna a faixa de áudio no tom pedido, gerando-a com o ffmpeg se não estiver no cache.
+
+        Com semitons == 0 retorna None (toca o áudio original do vídeo).
+        Pedidos simultâneos do mesmo arquivo aguardam uma única geração.
+        baixa_prioridade roda o ffmpeg abaixo da prioridade normal (pré-carregamento);
+        sem ela a geração usa todos os núcleos (renderizar_pitch_paralelo).
+        """
+        if semitons == 0:
+            return None
+
+        destino = self.caminho(video_file, semitons)
+        existente = self.obter(video_file, semitons)
+        if existente:
+            self.log(f"[TOM] ⚡ {os.path.basename(video_file)} ({semitons:+d}) encontrado no cache")
+            return existente
+
+        inicio = time.perf_counter()
+        original = self.caminho_audio_original(video_file)
+        self._gerar_uma_vez(original, lambda tmp: extrair_audio(video_file, tmp, baixa_prioridade))
+
+        def gerar(temporario):
+            if baixa_prioridade:
+                # Pré-carregamento: um núcleo só, sem disputar CPU com a música tocando
+                renderizar_pitch(original, semitons, temporario, baixa_prioridade)
+                return
+            try:
+                duracao = sondar_midia(video_file).duration
+            except Exception:
+                duracao = None
+            renderizar_pitch_paralelo(original, semitons, temporario, duracao)
+
+        if self._gerar_uma_vez(destino, gerar):
+            self.log(f"[TOM] {os.path.basename(video_file)} ({semitons:+d}) "
+                     f"gerado em {time.perf_counter() - inicio:.1f}s")
+            self.limpar_excedente(manter=(original, destino))
+        return destino
+
+    def iniciar_progressivo(self, video_file, semitons):
+        """Começa a gerar a faixa no tom pedido de forma progressiva (ver RenderizacaoProgressiva).
+
+        Retorna None se a faixa já está no cache ou já está sendo gerada por
+        outra thread; nesses casos use obter/obter_ou_gerar.
+        """
+        if semitons == 0:
+            return None
+        destino = self.caminho(video_file, semitons)
+        if self._marcar_uso(destino):
+            return None
+        with self._lock:
+            if destino in self._em_andamento:
+                return None
+            evento = self._em_andamento[destino] = threading.Event()
+
+        try:
+            # O FLAC já extraído é mais rápido de ler; senão lê direto do vídeo
+            origem = self._marcar_uso(self.caminho_audio_original(video_file)) or video_file
+            temporario = f"{destino}.{threading.get_ident()}.tmp"
+            processo = iniciar_pitch_progressivo(origem, semitons, temporario)
+        except BaseException:
+            self._concluir_geracao(destino, evento)
+            raise
+        return RenderizacaoProgressiva(self, video_file, semitons, destino, processo, temporario, evento)
+
+    def em_andamento(self, video_file, semitons):
+        """True se a faixa no tom pedido está sendo gerada agora"""
+        with self._lock:
+            return self.caminho(video_file, semitons) in self._em_andamento
+
+    def _concluir_geracao(self, destino, evento):
+        with self._lock:
+            del self._em_andamento[destino]
+        evento.set()
+
+    def _gerar_uma_vez(self, destino, gerar):
+        """Gera destino com gerar(arquivo_temporario) se ainda não existir no cache.
+
+        Outras threads pedindo o mesmo arquivo aguardam a geração em curso.
+        Retorna True se este chamado gerou o arquivo.
+        """
+        while True:
+            if self._marcar_uso(destino):
+                return False
+            with self._lock:
+                evento = self._em_andamento.get(destino)
+                if evento is None:
+                    evento = self._em_andamento[destino] = threading.Event()
+                    break
+            # Outra thread já está gerando este arquivo
+            evento.wait()
+
+        try:
+            temporario = f"{destino}.{threading.get_ident()}.tmp"
+            try:
+                gerar(temporario)
+                os.replace(temporario, destino)
+            finally:
+                if os.path.exists(temporario):
+                    os.unlink(temporario)
+        finally:
+            self._concluir_geracao(destino, evento)
+        return True
+
+    def limpar_excedente(self, manter=()):
+        """Remove os arquivos menos usados até o cache caber no tamanho máximo"""
+        manter = {os.path.abspath(caminho) for caminho in manter}
+        arquivos = []
+        total = 0
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or entrada.name.endswith('.tmp'):
+                    continue
+                st = entrada.stat()
+                arquivos.append((st.st_mtime, st.st_size, entrada.path))
+                total += st.st_size
+
+        removidos = 0
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.tamanho_maximo:
+                break
+            if os.path.abspath(caminho) in manter:
+                continue
+            try:
+                os.unlink(caminho)
+            except OSError:
+                continue  # em uso pelo player (Windows): fica para a próxima limpeza
+            total -= tamanho
+            removidos += 1
+        if removidos:
+            self.log(f"[TOM] Cache: {removidos} arquivo(s) antigo(s) removido(s)")
+        return removidos
+
+    def tamanho_total(self):
+        """Espaço ocupado pelo cache, em bytes"""
+        with os.scandir(self.pasta) as entradas:
+            return sum(e.stat().st_size for e in entradas if e.is_file())
+
+
+if __name__ == "__main__":
+    # Uso: python karaoke_pitch_cache.py VIDEO SEMITONS
+    if len(sys.argv) < 3:
+        print("Uso: python karaoke_pitch_cache.py VIDEO SEMITONS")
+        sys.exit(1)
+
+    cache = PitchCache()
+    inicio = time.perf_counter()
+    print(cache.obter_ou_gerar(sys.argv[1], int(sys.argv[2])))
+    print(f"{time.perf_counter() - inicio:.2f}s")
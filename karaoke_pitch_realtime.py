@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+
+try:
+    import numpy as np
+    import sounddevice as sd
+    TEMPO_REAL_DISPONIVEL = True
+except ImportError:
+    TEMPO_REAL_DISPONIVEL = False
+
+
+class PitchTempoReal:
+    """Mudança de tom em tempo real, sem pré-renderizar com o ffmpeg.
+
+    O áudio da música é decodificado pelo ffmpeg para um array NumPy (em
+    segundo plano, a reprodução pode começar antes do fim) e tocado pelo
+    sounddevice em blocos de ~46 ms, enquanto o VLC toca o vídeo mudo.
+
+    O tom é alterado no domínio do tempo por duas "cabeças de leitura" com
+    atraso variável (dente de serra de JANELA amostras) e cruzamento de
+    volume sin²/cos², calculadas de forma vetorizada para o bloco inteiro.
+    A latência fica constante (~JANELA/2), o que mantém o áudio sincronizado
+    com o vídeo, e uma mudança de semitons vale a partir do bloco seguinte.
+
+    O buffer de PCM cresce aos poucos (BUFFER_INICIAL segundos, depois
+    dobrando) e as cópias são feitas fora do _lock: as amostras abaixo de
+    _decodificado nunca mudam, então o callback de áudio só precisa do lock
+    para pegar a referência do buffer e avançar a posição.
+    """
+
+    TAXA = 44100
+    CANAIS = 2
+    TAMANHO_BLOCO = 2048  # ~46 ms por bloco
+    JANELA = 2048  # atraso máximo das cabeças de leitura
+    TOLERANCIA_SINCRONIA = 0.08  # segundos de diferença para o vídeo antes de ressincronizar
+    BUFFER_INICIAL = 30  # segundos de PCM alocados na carga
+
+    def __init__(self, log=print):
+        if not TEMPO_REAL_DISPONIVEL:
+            raise RuntimeError("NumPy e sounddevice são necessários para o tom em tempo real")
+        self.log = log
+        self.video_file = None
+        self._pcm = np.zeros((0, self.CANAIS), dtype=np.float32)
+        self._decodificado = 0  # amostras já disponíveis em _pcm
+        self._decodificador = None
+        self._cancelar_decodificacao = threading.Event()
+
+        self._lock = threading.Lock()
+        self._posicao = 0.0  # amostra de entrada correspondente ao tempo atual
+        self._fase = 0.0  # fase do dente de serra das cabeças de leitura (0..1)
+        self._semitons = 0
+        self._velocidade = 1.0
+        self._pausado = False
+        self._stream = None
+
+    # ------------------------------------------------------------------ carga
+
+    def carregar(self, video_file, duracao=None, fonte=None, ao_terminar=None):
+        """Começa a decodificar o áudio do vídeo; a reprodução pode iniciar em seguida.
+
+        fonte é um subprocess.Popen que já entrega o PCM (f32le, TAXA, CANAIS) pelo
+        stdout, como o da RenderizacaoProgressiva; sem ela o ffmpeg lê o vídeo.
+        ao_terminar(concluido) é chamada quando a leitura acaba, com concluido=False
+        se ela foi interrompida pela carga de outra música.
+        """
+        self.parar()
+        if self._decodificador and self._decodificador.is_alive():
+            self._cancelar_decodificacao.set()
+            self._decodificador.join(timeout=2)
+
+        estimado = int((duracao + 5) * self.TAXA) if duracao else None
+        pcm = np.empty((min(estimado or sys.maxsize, int(self.BUFFER_INICIAL * self.TAXA)), self.CANAIS),
+                       dtype=np.float32)
+        with self._lock:
+            self.video_file = video_file
+            self._pcm = pcm
+            self._decodificado = 0
+            self._posicao = 0.0
+            self._fase = 0.0
+
+        self._cancelar_decodificacao = threading.Event()
+        self._decodificador = threading.Thread(
+            target=self._decodificar,
+            args=(video_file, pcm, self._cancelar_decodificacao, fonte, ao_terminar, estimado), daemon=True)
+        self._decodificador.start()
+
+    @staticmethod
+    def _nova_capacidade(capacidade, necessario, estimado):
+        """Dobra o buffer, sem passar da duração estimada enquanto ela bastar"""
+        nova = max(necessario, capacidade * 2)
+        if estimado and necessario <= estimado:
+            nova = min(nova, estimado)
+        return nova
+
+    def _decodificar(self, video_file, pcm, cancelar, processo=None, ao_terminar=None, estimado=None):
+        inicio = time.perf_counter()
+        if processo is None:
+            processo = subprocess.Popen([
+                'ffmpeg', '-v', 'quiet', '-i', video_file,
+                '-map', '0:a:0', '-vn', '-ac', str(self.CANAIS), '-ar', str(self.TAXA),
+                '-f', 'f32le', '-'
+            ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+        bytes_por_amostra = 4 * self.CANAIS
+        decodificado = 0
+        concluido = False
+        try:
+            while not cancelar.is_set():
+                dados = processo.stdout.read(self.TAXA * bytes_por_amostra)  # ~1 s por leitura
+                if not dados:
+                    concluido = True  # fim do áudio
+                    break
+                amostras = np.frombuffer(dados[:len(dados) - len(dados) % bytes_por_amostra], dtype=np.float32)
+                amostras = amostras.reshape(-1, self.CANAIS)
+                fim = decodificado + len(amostras)
+                novo = pcm
+                if fim > len(pcm):
+                    # Buffer cheio: copia para um maior sem segurar o lock
+                    novo = np.empty((self._nova_capacidade(len(pcm), fim, estimado), self.CANAIS),
+                                    dtype=np.float32)
+                    novo[:decodificado] = pcm[:decodificado]
+                # Acima de _decodificado ninguém lê: pode escrever fora do lock
+                novo[decodificado:fim] = amostras
+                with self._lock:
+                    if pcm is not self._pcm:
+                        break  # outra música foi carregada
+                    self._pcm = pcm = novo
+                    self._decodificado = decodificado = fim
+        finally:
+            if ao_terminar is not None:
+                # Quem forneceu o processo decide o que fazer com ele (ex.: aguardar o fim da gravação)
+                ao_terminar(concluido)
+            else:
+                processo.kill()
+                processo.wait()
+        if not cancelar.is_set():
+            self.log(f"[TOM] Áudio decodificado para tempo real em {time.perf_counter() - inicio:.1f}s "
+                     f"({decodificado / self.TAXA:.0f}s de música)")
+
+    # --------------------------------------------------------------- controle
+
+    def iniciar(self, posicao_segundos=0.0):
+        """Abre a saída de áudio e começa a tocar a partir da posição dada"""
+        with self._lock:
+            self._posicao = posicao_segundos * self.TAXA
+            self._pausado = False
+        if self._stream is None:
+            self._stream = sd.OutputStream(
+                samplerate=self.TAXA, channels=self.CANAIS, dtype='float32',
+                blocksize=self.TAMANHO_BLOCO, callback=self._callback)
+            self._stream.start()
+
+    def parar(self):
+        """Fecha a saída de áudio"""
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            except Exception as e:
+                self.log(f"[TOM] ⚠️ Erro ao fechar saída de áudio: {e}")
+
+    def pausar(self, pausado=True):
+        with self._lock:
+            self._pausado = pausado
+
+    def definir_semitons(self, semitons):
+        """Novo tom, aplicado a partir do próximo bloco de áudio"""
+        with self._lock:
+            self._semitons = semitons
+
+    def definir_velocidade(self, velocidade):
+        """Acompanha a velocidade do vídeo (set_rate do VLC) mantendo o tom"""
+        with self._lock:
+            self._velocidade = velocidade
+
+    def sincronizar(self, tempo_video_segundos):
+        """Ressincroniza com o relógio do vídeo se a diferença passar da tolerância.
+
+        _posicao é o que está sendo entregue à placa; o que se ouve agora está
+        atrasado pela latência de saída do stream, que é descontada na
+        comparação (e somada ao reposicionar).
+        """
+        stream = self._stream
+        latencia = (stream.latency or 0.0) if stream is not None else 0.0
+        with self._lock:
+            adiantamento = latencia * self._velocidade * self.TAXA
+            diferenca = tempo_video_segundos - (self._posicao - adiantamento) / self.TAXA
+            if abs(diferenca) > self.TOLERANCIA_SINCRONIA:
+                self._posicao = tempo_video_segundos * self.TAXA + adiantamento
+                return True
+        return False
+
+    @property
+    def ativo(self):
+        return self._stream is not None
+
+    # ---------------------------------------------------------- processamento
+
+    def _callback(self, outdata, frames, time_info, status):
+        bloco = self.processar_bloco(frames)
+        if bloco is None:
+            outdata.fill(0)
+        else:
+            outdata[:] = bloco
+
+    def processar_bloco(self, frames):
+        """Gera o próximo bloco de saída (frames x canais) e avança a posição; None se pausado.
+
+        O lock só cobre a leitura do estado e o avanço da posição; o bloco é
+        calculado depois, sobre a referência do buffer pega dentro do lock.
+        """
+        with self._lock:
+            if self._pausado:
+                return None
+            pcm, decodificado = self._pcm, self._decodificado
+            razao = 2.0 ** (self._semitons / 12.0)
+            velocidade = self._velocidade
+            inicio = self._posicao
+            fase_inicial = self._fase
+            self._posicao += frames * velocidade
+            self._fase = float((fase_inicial - frames * (razao - velocidade) / self.JANELA) % 1.0)
+
+        if razao == 1.0 and velocidade == 1.0:
+            i = int(inicio)
+            bloco = np.zeros((frames, self.CANAIS), dtype=np.float32)
+            disponivel = max(0, min(frames, decodificado - i))
+            if disponivel:
+                bloco[:disponivel] = pcm[i:i + disponivel]
+            return bloco
+
+        n = np.arange(frames)
+        # A leitura anda "razao" amostras por amostra de saída enquanto o tempo anda "velocidade":
+        # o atraso (dente de serra em [0, JANELA)) absorve a diferença.
+        fase = (fase_inicial - n * (razao - velocidade) / self.JANELA) % 1.0
+        fase2 = (fase + 0.5) % 1.0
+
+        tempo = inicio + n * velocidade
+        ganho1 = np.sin(np.pi * fase) ** 2
+        saida = self._ler(pcm, decodificado, tempo - fase * self.JANELA) * ganho1[:, None]
+        saida += self._ler(pcm, decodificado, tempo - fase2 * self.JANELA) * (1.0 - ganho1)[:, None]
+        return saida.astype(np.float32, copy=False)
+
+    def _ler(self, pcm, decodificado, posicoes):
+        """Lê o áudio decodificado em posições fracionárias (interpolação linear)"""
+        base = np.floor(posicoes).astype(np.int64)
+        frac = (posicoes - base)[:, None].astype(np.float32)
+        limite = decodificado - 2
+        validas = (base >= 0) & (base <= limite)
+        base = np.clip(base, 0, max(limite, 0))
+        if limite < 0:
+            return np.zeros((len(posicoes), self.CANAIS), dtype=np.float32)
+        amostras = pcm[base] * (1.0 - frac) + pcm[base + 1] * frac
+        amostras[~validas] = 0.0
+        return amostras
+
+
+if __name__ == "__main__":
+    # Uso: python karaoke_pitch_realtime.py VIDEO SEMITONS
+    if len(sys.argv) < 3:
+        print("Uso: python karaoke_pitch_realtime.py VIDEO SEMITONS")
+        sys.exit(1)
+
+    motor = PitchTempoReal()
+    motor.carregar(sys.argv[1])
+    motor.definir_semitons(int(sys.argv[2]))
+    motor.iniciar()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        motor.parar()
@@ -4,13 +4,12 @@ import vlc
 import threading
 import time
 import os
-import subprocess
-import tempfile
-import json
-import socket
-import pickle
 from datetime import datetime
 import numpy as np
+from karaoke_pitch_cache import PitchCache, anexar_audio_tom, selecionar_audio_tom
+from karaoke_media_info import sondar_midia
+from karaoke_protocolo import ErroProtocolo, receber_mensagem
+from karaoke_transporte import anunciar_endpoint, criar_servidor, fechar_servidor
 
 try:
     import sounddevice as sd
@@ -53,19 +52,22 @@ class KaraokePlayer:
         
         self.video_file = None
         self.processed_file = None
+        self.audio_tom = None  # faixa de áudio com o tom alterado, tocada junto com o vídeo
         self.pitch_shift = 0
         self.is_playing = False
+        self.media_info = None  # MediaInfo do vídeo carregado
         self.duration = 0
         self.fps = 30
         self.width = 0
         self.height = 0
         self.video_thread = None
         self.processing_pitch = False
+        self.pitch_cache = PitchCache(log=self.debug_log)
         
         # Servidor de socket para receber comandos
         self.socket_server = None
         self.server_thread = None
-        self.porta = 5555
+        self.endpoint = None  # "unix:CAMINHO" ou "tcp:127.0.0.1:PORTA", anunciado ao processo pai
         self.iniciar_servidor()
 
         self.setup_ui()
@@ -112,13 +114,12 @@ class KaraokePlayer:
         """Inicia servidor socket para receber comandos do painel de controle"""
         def servidor():
             try:
-                self.debug_log(f"🔧 Iniciando servidor socket na porta {self.porta}...")
-                self.socket_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self.socket_server.bind(('127.0.0.1', self.porta))
-                self.socket_server.listen(1)
+                self.debug_log("🔧 Iniciando servidor de comandos...")
+                # AF_UNIX quando disponível, senão TCP numa porta livre (ver karaoke_transporte)
+                self.socket_server, self.endpoint = criar_servidor()
+                anunciar_endpoint(self.endpoint)
                 
-                self.debug_log(f"✅ Servidor ouvindo na porta {self.porta}")
+                self.debug_log(f"✅ Servidor ouvindo em {self.endpoint}")
                 
                 while not self.force_quit:
                     try:
@@ -145,30 +146,20 @@ class KaraokePlayer:
         """Processa comandos recebidos via socket"""
         try:
             while not self.force_quit:
-                # Recebe o tamanho da mensagem
-                size_bytes = conn.recv(4)
-                if not size_bytes:
+                # Mensagens no protocolo binário de karaoke_protocolo (cabeçalho + corpo)
+                mensagem = receber_mensagem(conn)
+                if mensagem is None:
                     break
-                
-                size = int.from_bytes(size_bytes, 'big')
-                
-                # Recebe a mensagem completa
-                data = b''
-                while len(data) < size:
-                    packet = conn.recv(size - len(data))
-                    if not packet:
-                        break
-                    data += packet
-                
-                mensagem = pickle.loads(data)
-                comando = mensagem.get('comando')
-                dados = mensagem.get('dados')
+                comando, dados = mensagem
                 
                 self.debug_log(f"📥 Comando recebido: {comando}")
                 
                 # Executa comando na thread principal (UI)
                 self.root.after(0, lambda c=comando, d=dados: self.executar_comando(c, d))
                 
+        except ErroProtocolo as e:
+            # Cliente de outra versão ou dados corrompidos: o fluxo não é mais confiável
+            self.debug_log(f"⚠️ Mensagem inválida, encerrando conexão: {e}")
         except Exception as e:
             if not self.force_quit:
                 self.debug_log(f"⚠️ Erro ao processar comando: {e}")
@@ -181,10 +172,8 @@ class KaraokePlayer:
             if comando == 'load':
                 self.video_file = dados['path']
                 self.processed_file = dados['path']
-                self.duration = dados.get('duration', 0)
-                self.fps = dados.get('fps', 30)
-                self.width = dados.get('width', 640)
-                self.height = dados.get('height', 480)
+                # O painel envia o MediaInfo já sondado; sem ele, sonda aqui
+                self._aplicar_media_info(dados.get('info') or sondar_midia(dados['path']))
                 self.pitch_shift = 0
                 self.pitch_label.config(text="0")
                 self.file_label.config(text=os.path.basename(dados['path']))
@@ -218,6 +207,14 @@ class KaraokePlayer:
         except Exception as e:
             self.debug_log(f"❌ Erro ao executar comando {comando}: {e}")
     
+    def _aplicar_media_info(self, info):
+        """Usa os metadados (MediaInfo) do vídeo carregado"""
+        self.media_info = info
+        self.fps = info.fps
+        self.width = info.width
+        self.height = info.height
+        self.duration = info.duration
+    
     def fechar_aplicacao(self):
         """Fecha a aplicação de forma limpa SEM confirmação"""
         if self.closing:
@@ -270,16 +267,11 @@ class KaraokePlayer:
                 else:
                     self.debug_log("✅ Thread finalizada")
         
-        # 4. LIMPAR ARQUIVOS TEMPORÁRIOS
-        if hasattr(self, 'processed_file') and self.processed_file:
-            if self.processed_file != getattr(self, 'video_file', None):
-                try:
-                    if os.path.exists(self.processed_file):
-                        self.debug_log(f"4️⃣ Removendo arquivo temporário: {os.path.basename(self.processed_file)}")
-                        os.unlink(self.processed_file)
-                        self.debug_log("✅ Arquivo temporário removido")
-                except Exception as e:
-                    self.debug_log(f"⚠️ Erro ao remover arquivo: {e}")
+        # 4. FECHAR CANAL DE COMANDOS (remove o arquivo do socket AF_UNIX)
+        try:
+            fechar_servidor(self.socket_server, self.endpoint)
+        except Exception as e:
+            self.debug_log(f"⚠️ Erro ao fechar servidor de comandos: {e}")
         
         self.debug_log("=" * 60)
         self.debug_log("✅ FECHAMENTO CONCLUÍDO - DESTRUINDO JANELA")
@@ -1181,21 +1173,8 @@ class KaraokePlayer:
             self.debug_log(f"📂 Usuário selecionou arquivo: {file_path}")
             
             try:
-                result = subprocess.run([
-                    'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                    '-show_format', '-show_streams', file_path
-                ], capture_output=True, text=True, check=True)
-                
-                info = json.loads(result.stdout)
-                
-                for stream in info['streams']:
-                    if stream['codec_type'] == 'video':
-                        self.fps = eval(stream.get('r_frame_rate', '30/1'))
-                        self.width = stream['width']
-                        self.height = stream['height']
-                        break
-                
-                self.duration = float(info['format']['duration'])
+                # ffprobe só na primeira vez: depois vem da tabela media_metadata
+                self._aplicar_media_info(sondar_midia(file_path))
                 self.video_file = file_path
                 self.processed_file = file_path
                 self.pitch_shift = 0
@@ -1282,12 +1261,6 @@ class KaraokePlayer:
         if self.pitch_shift != 0:
             self.process_audio_with_pitch()
         else:
-            if self.processed_file != self.video_file and os.path.exists(self.processed_file):
-                try:
-                    os.unlink(self.processed_file)
-                except:
-                    pass
-                    
             self.processed_file = self.video_file
             self.status_label.config(text="Tom original restaurado")
             self.root.config(cursor="")
@@ -1298,33 +1271,9 @@ class KaraokePlayer:
         def process():
             try:
                 self.processing_pitch = True
-                temp_output = tempfile.mktemp(suffix='.mp4')
-                
-                semitones = self.pitch_shift
-                pitch_ratio = 2 ** (semitones / 12.0)
-                tempo_factor = 1.0 / pitch_ratio
-                
-                if 0.5 <= tempo_factor <= 2.0:
-                    audio_filter = f'asetrate=44100*{pitch_ratio},aresample=44100,atempo={tempo_factor}'
-                else:
-                    audio_filter = f'asetrate=44100*{pitch_ratio},aresample=44100'
-                
-                subprocess.run([
-                    'ffmpeg', '-y', '-i', self.video_file,
-                    '-filter_complex', 
-                    f'[0:a]{audio_filter}[audio]',
-                    '-map', '0:v', '-map', '[audio]',
-                    '-c:v', 'copy', '-c:a', 'aac', '-b:a', '192k',
-                    temp_output
-                ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-                
-                if self.processed_file != self.video_file and os.path.exists(self.processed_file):
-                    try:
-                        os.unlink(self.processed_file)
-                    except:
-                        pass
-                
-                self.processed_file = temp_output
+                # Só o áudio é processado; faixas já geradas (mesma música e tom) saem do cache
+                self.audio_tom = self.pitch_cache.obter_ou_gerar(self.video_file, self.pitch_shift)
+                self.processed_file = self.video_file
                 self.root.after(0, self._update_ui_after_pitch_success)
                 
             except Exception as e:
@@ -1350,6 +1299,7 @@ class KaraokePlayer:
         self.hide_progress()
         self.pitch_shift = 0
         self.pitch_label.config(text="0")
+        self.audio_tom = None
         self.processed_file = self.video_file
         messagebox.showerror("Erro", f"Não foi possível processar o áudio.\n{error_msg}")
         
@@ -1365,9 +1315,15 @@ class KaraokePlayer:
         
         # Carrega e reproduz a mídia
         media = self.vlc_instance.media_new(self.processed_file)
+        tocar_audio_tom = self.pitch_shift != 0 and self.audio_tom
+        if tocar_audio_tom:
+            # Vídeo original + faixa de áudio no tom escolhido
+            anexar_audio_tom(media, self.audio_tom)
         self.player.set_media(media)
         self.player.play()
         self.is_playing = True
+        if tocar_audio_tom:
+            self._selecionar_audio_tom()
         self.status_label.config(text="▶ Reproduzindo...")
         
         # Inicia captura de áudio para pontuação
@@ -1377,6 +1333,17 @@ class KaraokePlayer:
         # Aguarda um pouco para garantir que o player iniciou
         self.root.after(100, lambda: None)
     
+    def _selecionar_audio_tom(self, tentativas=20):
+        """Troca para a faixa com o tom alterado assim que o VLC listar as faixas de áudio"""
+        try:
+            if selecionar_audio_tom(self.player):
+                return
+        except Exception as e:
+            self.debug_log(f"⚠️ Erro ao selecionar faixa de áudio do tom: {e}")
+            return
+        if tentativas > 0:
+            self.root.after(100, lambda: self._selecionar_audio_tom(tentativas - 1))
+    
     def pause(self):
         if self.is_playing:
             self.player.pause()
@@ -0,0 +1,81 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from karaoke_media_info import sondar_midia
+
+
+class PrefetchEvento:
+    """Prepara com antecedência as próximas músicas da fila do evento.
+
+    Para as próximas músicas ainda não tocadas, sonda os metadados (ffprobe) e
+    gera a versão no tom da inscrição (tom_ajuste) no cache de tom, para que a
+    música comece na hora quando chegar a vez dela. O trabalho roda num pool
+    limitado de threads e o ffmpeg em baixa prioridade, sem disputar CPU com a
+    música que está tocando.
+    """
+
+    ANTECEDENCIA = 3  # quantas músicas à frente preparar
+    MAX_WORKERS = 1
+
+    def __init__(self, pitch_cache, antecedencia=None, max_workers=None, log=print):
+        self.pitch_cache = pitch_cache
+        self.antecedencia = antecedencia or self.ANTECEDENCIA
+        self.log = log
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or self.MAX_WORKERS,
+                                            thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._agendados = set()  # {(caminho, tom)} enviados ao pool e ainda não concluídos
+        self._prontos = set()  # {(caminho, tom)} já preparados (a faixa pode ter saído do cache depois)
+        self._parado = False
+        self.gerar_tom = True  # False com o tom em tempo real: só sonda os metadados
+
+    def agendar(self, playlist, atual_id=None):
+        """Agenda a preparação das próximas músicas não tocadas da playlist (na ordem).
+
+        atual_id é a música que está começando agora; ela é preparada pelo
+        próprio player e fica fora da antecedência.
+        """
+        proximas = [m for m in playlist if not m['ja_tocou'] and m['id'] != atual_id]
+        for musica in proximas[:self.antecedencia]:
+            caminho = musica['arquivo_path']
+            tom = musica.get('tom_ajuste') or 0
+            chave = (caminho, tom)
+            with self._lock:
+                pronto = chave in self._prontos
+            if pronto and not self._falta_tom(caminho, tom):
+                continue
+            with self._lock:
+                if self._parado or chave in self._agendados:
+                    continue
+                self._prontos.discard(chave)
+                self._agendados.add(chave)
+            self._executor.submit(self._preparar, caminho, tom)
+
+    def _falta_tom(self, caminho, tom):
+        """True se a faixa no tom deveria estar no cache e não está (ex.: removida pelo limite do cache)"""
+        return tom != 0 and self.gerar_tom and self.pitch_cache.obter(caminho, tom) is None
+
+    def _preparar(self, caminho, tom):
+        if self._parado:
+            return
+        try:
+            if not os.path.exists(caminho):
+                return
+            sondar_midia(caminho)
+            if tom != 0 and self.gerar_tom:
+                self.pitch_cache.obter_ou_gerar(caminho, tom, baixa_prioridade=True)
+            self.log(f"[PREFETCH] {os.path.basename(caminho)} ({tom:+d}) pronto")
+            with self._lock:
+                self._prontos.add((caminho, tom))
+        except Exception as e:
+            # Fica fora de _prontos: nova tentativa no próximo agendamento
+            self.log(f"[PREFETCH] ⚠️ Erro ao preparar {os.path.basename(caminho)}: {e}")
+        finally:
+            with self._lock:
+                self._agendados.discard((caminho, tom))
+
+    def parar(self):
+        """Cancela o que ainda não começou e não aceita novos agendamentos"""
+        with self._lock:
+            self._parado = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,173 @@
+import struct
+from karaoke_media_info import MediaInfo
+
+# Protocolo binário dos comandos painel -> player.
+#
+# Cada mensagem é um cabeçalho fixo seguido do corpo do comando:
+#   cabeçalho: "KP" | versão (1 byte) | código do comando (1 byte) | tamanho do corpo (4 bytes)
+#   load:  caminho | tem_info (1 byte) [| duração, fps (double) | largura, altura, taxa (uint32)
+#          | codec de vídeo | codec de áudio]
+#   pitch: semitons (int16)
+#   seek:  tempo em segundos (double)
+#   play, pause, stop, quit: corpo vazio
+# Textos são UTF-8 precedidos do tamanho (uint16); 0xFFFF representa None.
+# Tudo em big-endian. Qualquer mudança de formato exige uma nova VERSAO_PROTOCOLO.
+
+VERSAO_PROTOCOLO = 1
+MAGICO = b'KP'
+TAMANHO_MAXIMO_CORPO = 64 * 1024
+
+COMANDOS = {'load': 1, 'play': 2, 'pause': 3, 'stop': 4, 'pitch': 5, 'seek': 6, 'quit': 7}
+_NOMES_COMANDOS = {codigo: nome for nome, codigo in COMANDOS.items()}
+
+CABECALHO = struct.Struct('>2sBBI')
+_TAMANHO_TEXTO = struct.Struct('>H')
+_INFO = struct.Struct('>ddIII')
+_PITCH = struct.Struct('>h')
+_SEEK = struct.Struct('>d')
+_BYTE = struct.Struct('>B')
+_TEXTO_NULO = 0xFFFF
+
+
+class ErroProtocolo(ValueError):
+    """Mensagem inválida, de versão desconhecida ou com comando desconhecido"""
+
+
+def _codificar_texto(texto):
+    if texto is None:
+        return _TAMANHO_TEXTO.pack(_TEXTO_NULO)
+    dados = texto.encode('utf-8')
+    if len(dados) >= _TEXTO_NULO:
+        raise ErroProtocolo("Texto longo demais para o protocolo")
+    return _TAMANHO_TEXTO.pack(len(dados)) + dados
+
+
+def _decodificar_texto(corpo, posicao):
+    tamanho, = _TAMANHO_TEXTO.unpack_from(corpo, posicao)
+    posicao += _TAMANHO_TEXTO.size
+    if tamanho == _TEXTO_NULO:
+        return None, posicao
+    if posicao + tamanho > len(corpo):
+        raise ErroProtocolo("Texto truncado")
+    return bytes(corpo[posicao:posicao + tamanho]).decode('utf-8'), posicao + tamanho
+
+
+def _codificar_load(dados):
+    info = dados.get('info')
+    if info is None and 'duration' in dados:
+        # Formato antigo do comando: campos avulsos em vez do MediaInfo
+        info = MediaInfo(dados['duration'], dados.get('fps', 30), dados.get('width', 640), dados.get('height', 480))
+    corpo = _codificar_texto(dados['path'])
+    if info is None:
+        return corpo + _BYTE.pack(0)
+    return (corpo + _BYTE.pack(1)
+            + _INFO.pack(info.duration, info.fps, info.width, info.height, info.sample_rate or 0)
+            + _codificar_texto(info.video_codec) + _codificar_texto(info.audio_codec))
+
+
+def _decodificar_load(corpo):
+    caminho, posicao = _decodificar_texto(corpo, 0)
+    tem_info, = _BYTE.unpack_from(corpo, posicao)
+    posicao += _BYTE.size
+    info = None
+    if tem_info:
+        duracao, fps, largura, altura, taxa = _INFO.unpack_from(corpo, posicao)
+        posicao += _INFO.size
+        codec_video, posicao = _decodificar_texto(corpo, posicao)
+        codec_audio, posicao = _decodificar_texto(corpo, posicao)
+        info = MediaInfo(duracao, fps, largura, altura, taxa, codec_video, codec_audio)
+    return {'path': caminho, 'info': info}, posicao
+
+
+def codificar_mensagem(comando, dados=None):
+    """Codifica um comando e seus dados (mesmo dicionário aceito por executar_comando) em bytes.
+
+    Levanta ErroProtocolo se o comando for desconhecido ou os dados não couberem no formato.
+    """
+    codigo = COMANDOS.get(comando)
+    if codigo is None:
+        raise ErroProtocolo(f"Comando desconhecido: {comando!r}")
+    dados = dados or {}
+    try:
+        if comando == 'load':
+            corpo = _codificar_load(dados)
+        elif comando == 'pitch':
+            corpo = _PITCH.pack(dados.get('steps', 0))
+        elif comando == 'seek':
+            corpo = _SEEK.pack(dados.get('time', 0))
+        else:
+            corpo = b''
+    except (struct.error, TypeError, AttributeError, KeyError) as e:
+        # Valor fora da faixa do campo (ex.: steps=40000) ou de tipo errado
+        raise ErroProtocolo(f"Dados inválidos para '{comando}': {e}") from e
+    return CABECALHO.pack(MAGICO, VERSAO_PROTOCOLO, codigo, len(corpo)) + corpo
+
+
+def decodificar_cabecalho(cabecalho):
+    """Valida o cabeçalho e retorna (código do comando, tamanho do corpo)"""
+    magico, versao, codigo, tamanho = CABECALHO.unpack(cabecalho)
+    if magico != MAGICO:
+        raise ErroProtocolo("Mensagem não pertence ao protocolo do player")
+    if versao != VERSAO_PROTOCOLO:
+        raise ErroProtocolo(f"Versão do protocolo não suportada: {versao}")
+    if codigo not in _NOMES_COMANDOS:
+        raise ErroProtocolo(f"Código de comando desconhecido: {codigo}")
+    if tamanho > TAMANHO_MAXIMO_CORPO:
+        raise ErroProtocolo(f"Mensagem grande demais: {tamanho} bytes")
+    return codigo, tamanho
+
+
+def decodificar_corpo(codigo, corpo):
+    """Decodifica o corpo de um comando; retorna (comando, dados)"""
+    comando = _NOMES_COMANDOS[codigo]
+    try:
+        if comando == 'load':
+            dados, posicao = _decodificar_load(corpo)
+        elif comando == 'pitch':
+            dados, posicao = {'steps': _PITCH.unpack_from(corpo)[0]}, _PITCH.size
+        elif comando == 'seek':
+            dados, posicao = {'time': _SEEK.unpack_from(corpo)[0]}, _SEEK.size
+        else:
+            dados, posicao = None, 0
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ErroProtocolo(f"Corpo inválido para '{comando}': {e}") from e
+    if posicao != len(corpo):
+        raise ErroProtocolo(f"Corpo de '{comando}' com {len(corpo) - posicao} bytes sobrando")
+    return comando, dados
+
+
+def decodificar_mensagem(mensagem):
+    """Decodifica uma mensagem completa (cabeçalho + corpo); retorna (comando, dados)"""
+    if len(mensagem) < CABECALHO.size:
+        raise ErroProtocolo("Mensagem menor que o cabeçalho")
+    codigo, tamanho = decodificar_cabecalho(mensagem[:CABECALHO.size])
+    if len(mensagem) != CABECALHO.size + tamanho:
+        raise ErroProtocolo("Tamanho do corpo não confere com o cabeçalho")
+    return decodificar_corpo(codigo, memoryview(mensagem)[CABECALHO.size:])
+
+
+def _receber_exato(conn, tamanho):
+    dados = bytearray()
+    while len(dados) < tamanho:
+        pacote = conn.recv(tamanho - len(dados))
+        if not pacote:
+            return None
+        dados += pacote
+    return dados
+
+
+def receber_mensagem(conn):
+    """Lê a próxima mensagem do socket; retorna (comando, dados) ou None se a conexão foi fechada"""
+    cabecalho = _receber_exato(conn, CABECALHO.size)
+    if cabecalho is None:
+        return None
+    codigo, tamanho = decodificar_cabecalho(cabecalho)
+    corpo = _receber_exato(conn, tamanho)
+    if corpo is None:
+        return None
+    return decodificar_corpo(codigo, corpo)
+
+
+def enviar_comando(conn, comando, dados=None):
+    """Envia um comando ao player pelo socket já conectado"""
+    conn.sendall(codificar_mensagem(comando, dados))
@@ -0,0 +1,121 @@
+import os
+import socket
+import tempfile
+
+# Canal de comandos painel -> player.
+#
+# O player ouve, de preferência, num socket AF_UNIX próprio (um arquivo por
+# processo no diretório temporário); onde não houver AF_UNIX (o CPython no
+# Windows não tem socket.AF_UNIX, então lá é sempre TCP), ou se ele falhar,
+# usa TCP em 127.0.0.1, na PORTA_PADRAO se estiver livre ou numa
+# porta escolhida pelo sistema. O endereço escolhido ("endpoint") é anunciado
+# no stdout e, se o processo pai pediu, gravado no arquivo indicado pela
+# variável de ambiente VARIAVEL_ANUNCIO. Assim várias
+# janelas do player podem rodar na mesma máquina.
+
+PORTA_PADRAO = 5555
+VARIAVEL_ANUNCIO = "KARAOKE_PLAYER_ENDPOINT_ARQUIVO"
+PREFIXO_ANUNCIO = "KARAOKE_PLAYER_ENDPOINT="
+
+
+def unix_disponivel():
+    return hasattr(socket, 'AF_UNIX')
+
+
+def _criar_servidor_unix(backlog):
+    caminho = os.path.join(tempfile.gettempdir(), f"karaoke_player_{os.getpid()}.sock")
+    if os.path.exists(caminho):
+        os.unlink(caminho)  # sobra de um processo antigo com o mesmo PID
+    servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        servidor.bind(caminho)
+        os.chmod(caminho, 0o600)  # só o usuário atual pode enviar comandos
+        servidor.listen(backlog)
+    except OSError:
+        servidor.close()
+        raise
+    return servidor, f"unix:{caminho}"
+
+
+def _criar_servidor_tcp(porta, backlog):
+    servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name == 'nt':
+        # No Windows o SO_REUSEADDR permitiria "roubar" a porta de outra instância
+        servidor.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+    else:
+        servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        try:
+            servidor.bind(('127.0.0.1', porta))
+        except OSError:
+            # Porta em uso (outra instância do player): o sistema escolhe uma livre
+            servidor.bind(('127.0.0.1', 0))
+        servidor.listen(backlog)
+    except OSError:
+        servidor.close()
+        raise
+    return servidor, f"tcp:127.0.0.1:{servidor.getsockname()[1]}"
+
+
+def criar_servidor(preferir_unix=True, porta=PORTA_PADRAO, backlog=5):
+    """Abre o socket de comandos do player; retorna (socket, endpoint).
+
+    endpoint é "unix:CAMINHO" ou "tcp:127.0.0.1:PORTA" (ver conectar).
+    """
+    if preferir_unix and unix_disponivel():
+        try:
+            return _criar_servidor_unix(backlog)
+        except OSError as e:
+            print(f"⚠️ Socket AF_UNIX indisponível ({e}), usando TCP")
+    return _criar_servidor_tcp(porta, backlog)
+
+
+def fechar_servidor(servidor, endpoint):
+    """Fecha o socket de comandos e remove o arquivo do socket AF_UNIX"""
+    if servidor is not None:
+        servidor.close()
+    if endpoint and endpoint.startswith('unix:'):
+        try:
+            os.unlink(endpoint[len('unix:'):])
+        except OSError:
+            pass
+
+
+def conectar(endpoint=None, timeout=5.0):
+    """Conecta ao player no endpoint anunciado (sem endpoint: TCP na PORTA_PADRAO, como antes).
+
+    timeout vale só para a conexão; o socket retornado é bloqueante.
+    """
+    endpoint = endpoint or f"tcp:127.0.0.1:{PORTA_PADRAO}"
+    tipo, _, endereco = endpoint.partition(':')
+    if tipo == 'unix':
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        destino = endereco
+    elif tipo == 'tcp':
+        host, _, porta = endereco.rpartition(':')
+        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # comandos pequenos: sem Nagle
+        destino = (host, int(porta))
+    else:
+        raise ValueError(f"Endpoint inválido: {endpoint!r}")
+    conn.settimeout(timeout)
+    try:
+        conn.connect(destino)
+    except OSError:
+        conn.close()
+        raise
+    conn.settimeout(None)
+    return conn
+
+
+def anunciar_endpoint(endpoint):
+    """Informa ao processo pai onde o player está ouvindo (stdout e arquivo de VARIAVEL_ANUNCIO)"""
+    print(f"{PREFIXO_ANUNCIO}{endpoint}", flush=True)
+    arquivo = os.environ.get(VARIAVEL_ANUNCIO)
+    if arquivo:
+        # Grava e renomeia: o pai nunca lê o arquivo pela metade
+        temporario = f"{arquivo}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(endpoint)
+        os.replace(temporario, arquivo)
+
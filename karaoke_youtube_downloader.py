@@ -10,9 +10,10 @@ from PIL import Image, ImageTk
 import vlc
 
 class YouTubeDownloaderWindow:
-    def __init__(self, parent, music_folder):
+    def __init__(self, parent, music_folder, ao_baixar=None):
         self.parent = parent
         self.music_folder = music_folder
+        self.ao_baixar = ao_baixar  # Callback chamado com o caminho do arquivo baixado
         self.videos_encontrados = []
         self.download_em_progresso = False
         self.busca_em_progresso = False
@@ -781,6 +782,9 @@ class YouTubeDownloaderWindow:
                                 base_name = base_name.rsplit('.', 1)[0]
                             arquivo = os.path.join(self.music_folder, base_name + '.mp4')
                 
+                if self.ao_baixar:
+                    self.ao_baixar(arquivo)
+                
                 def pos_download():
                     if video_item is not None:
                         video_item['arquivo_local'] = arquivo
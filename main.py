@@ -8,11 +8,15 @@ import time
 import os
 import subprocess
 import tempfile
-import json
 from datetime import datetime
 import sys
 import signal
 from karaoke_youtube_downloader import YouTubeDownloaderWindow
+from karaoke_media_index import MediaIndex
+from karaoke_pitch_cache import PitchCache, anexar_audio_tom, selecionar_audio_tom
+from karaoke_prefetch import PrefetchEvento
+from karaoke_pitch_realtime import PitchTempoReal, TEMPO_REAL_DISPONIVEL
+from karaoke_media_info import sondar_midia
 
 try:
     import sounddevice as sd
@@ -148,6 +152,14 @@ class KaraokePlayer:
         self.root.configure(bg="#1a1a1a")
         self.force_quit = False  # Adicione esta flag
         self.music_folder = r"D:/"
+        self.media_index = MediaIndex(self.music_folder, log=self.debug_log)
+        self.media_index.iniciar_monitoramento()
+        self.pitch_cache = PitchCache(log=self.debug_log)
+        self.prefetch = PrefetchEvento(self.pitch_cache, log=self.debug_log)
+        self.motor_tom = None  # PitchTempoReal, criado ao tocar com o tom em tempo real
+        self.render_tom = None  # RenderizacaoProgressiva a tocar no próximo play()
+        self._tom_pre_afinado = 0  # semitons já aplicados no áudio carregado no motor_tom (render progressivo)
+        self._sincronia_tom_id = None  # after() pendente de _sincronizar_tom_tempo_real
 
         # LOG INICIAL
         self.debug_log("=" * 60)
@@ -172,9 +184,11 @@ class KaraokePlayer:
         
         self.video_file = None
         self.processed_file = None
+        self.audio_tom = None  # faixa de áudio com o tom alterado, tocada junto com o vídeo
         self.pitch_shift = 0
         self.playback_speed = 1.0  # Velocidade de reprodução (1.0 = normal)
         self.is_playing = False
+        self.media_info = None  # MediaInfo do vídeo carregado
         self.duration = 0
         self.fps = 30
         self.width = 0
@@ -296,6 +310,18 @@ class KaraokePlayer:
         self.is_playing = False
         self.progress_animation_running = False
         
+        # Parar monitoramento da pasta de músicas
+        if hasattr(self, 'media_index'):
+            self.media_index.parar_monitoramento()
+        
+        # Cancelar preparação antecipada das próximas músicas
+        if hasattr(self, 'prefetch'):
+            self.prefetch.parar()
+        
+        # Fechar saída de áudio do tom em tempo real
+        if getattr(self, 'motor_tom', None):
+            self.motor_tom.parar()
+        
         # Parar player VLC
         if hasattr(self, 'player') and self.player:
             try:
@@ -344,17 +370,6 @@ class KaraokePlayer:
             self.debug_log("⚠️ Interrompendo processamento de pitch...")
             self.processing_pitch = False
         
-        # Limpar arquivos temporários
-        if hasattr(self, 'processed_file') and self.processed_file:
-            if self.processed_file != getattr(self, 'video_file', None):
-                try:
-                    if os.path.exists(self.processed_file):
-                        self.debug_log(f"🗑️ Removendo arquivo temporário: {self.processed_file}")
-                        os.unlink(self.processed_file)
-                        self.debug_log("✅ Arquivo temporário removido")
-                except Exception as e:
-                    self.debug_log(f"⚠️ Erro ao remover arquivo: {e}")
-        
         # Fechar todas as janelas filhas (Toplevel)
         try:
             for widget in self.root.winfo_children():
@@ -412,7 +427,7 @@ class KaraokePlayer:
         # Consulta quantidade de músicas no catálogo
         try:
             db = KaraokeDatabase()
-            total_musicas = len(db.buscar_catalogo())
+            total_musicas = db.contar_catalogo()
         except Exception:
             total_musicas = 0
 
@@ -455,9 +470,32 @@ class KaraokePlayer:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         scrollbar = tk.Scrollbar(result_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        # Sem termo, o catálogo é carregado em páginas conforme a rolagem
+        pagina = {'chave': None, 'carregando': False}
+
+        def carregar_proxima_pagina():
+            if pagina['chave'] is None or pagina['carregando']:
+                return
+            pagina['carregando'] = True
+            try:
+                linhas, pagina['chave'] = db.buscar_catalogo_pagina(apos=pagina['chave'])
+                for row in linhas:
+                    tree.insert("", tk.END, values=row)
+            except Exception as e:
+                pagina['chave'] = None
+                self.debug_log(f"[CATALOGO] Erro ao carregar página: {e}")
+            finally:
+                pagina['carregando'] = False
+
+        def on_tree_scroll(primeiro, ultimo):
+            scrollbar.set(primeiro, ultimo)
+            if float(ultimo) >= 0.95 and pagina['chave'] is not None:
+                busca_win.after_idle(carregar_proxima_pagina)
+
+        tree.configure(yscrollcommand=on_tree_scroll)
+
         # Frame para botões
         btn_frame = tk.Frame(busca_win, bg="#222", pady=10)
         btn_frame.pack(fill=tk.X)
@@ -465,9 +503,15 @@ class KaraokePlayer:
         # Função de busca
         def buscar():
             termo = termo_var.get().strip()
-            db = KaraokeDatabase()
+            pagina['chave'] = None
             try:
-                resultados = db.buscar_catalogo(termo) if termo else db.buscar_catalogo()
+                if termo:
+                    resultados = db.buscar_catalogo(termo)
+                    if not resultados:
+                        # Nenhum resultado exato: sugere músicas parecidas (tolera erros de digitação)
+                        resultados = db.buscar_catalogo_aproximado(termo)
+                else:
+                    resultados, pagina['chave'] = db.buscar_catalogo_pagina()
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao buscar catálogo:\n{e}")
                 return
@@ -676,36 +720,54 @@ class KaraokePlayer:
         buscar()
             
     def buscar_arquivo_mp4(self, codigo):
-        """Busca arquivo MP4 na pasta de músicas selecionada e subpastas"""
+        """Busca arquivo MP4 na pasta de músicas selecionada e subpastas (via índice de mídia)"""
         base_path = self.music_folder
         
-        # Converte para string e completa com zeros à esquerda até ter 5 dígitos
-        codigo_str = str(codigo).strip()
-        
-        # Se for numérico, completa com zeros
-        if codigo_str.isdigit():
-            codigo_formatado = codigo_str.zfill(5)
-        else:
-            codigo_formatado = codigo_str
-        
-        arquivo_nome = f"{codigo_formatado}.mp4"
-        
         if not os.path.exists(base_path):
             messagebox.showwarning(
                 "Pasta não encontrada",
                 f"A pasta {base_path} não foi encontrada.\nVerifique se ela existe."
             )
             return None
-            
-        # Procura recursivamente
-        for root, dirs, files in os.walk(base_path):
-            for file in files:
-                # Compara tanto o nome formatado quanto o original
-                if file.lower() == arquivo_nome.lower() or \
-                (codigo_str != codigo_formatado and file.lower() == f"{codigo_str}.mp4".lower()):
-                    return os.path.join(root, file)
         
-        return None
+        return self.media_index.buscar_arquivo(codigo)
+
+    def reindexar_pasta_musicas(self):
+        """Reconstrói o índice de arquivos da pasta de músicas em segundo plano"""
+        if not os.path.exists(self.music_folder):
+            messagebox.showwarning(
+                "Pasta não encontrada",
+                f"A pasta {self.music_folder} não foi encontrada.\nVerifique se ela existe."
+            )
+            return
+        
+        self.show_progress("Indexando pasta de músicas...")
+        
+        def proc():
+            try:
+                total = self.media_index.reconstruir()
+                faltando = len(self.media_index.codigos_sem_arquivo())
+                self.debug_log(f"[INDICE] {faltando} códigos do catálogo sem arquivo")
+                self.root.after(0, lambda: self._reindexar_ok(total, faltando))
+            except Exception as e:
+                self.debug_log(f"[INDICE] ERRO ao reindexar: {e}")
+                self.root.after(0, lambda erro=str(e): self._reindexar_erro(erro))
+        
+        threading.Thread(target=proc, daemon=True).start()
+    
+    def _reindexar_ok(self, total, faltando):
+        self.hide_progress()
+        self.status_label.config(text=f"✓ {total} músicas indexadas")
+        messagebox.showinfo(
+            "Índice de Músicas",
+            f"✅ Pasta reindexada!\n\n"
+            f"📁 Arquivos indexados: {total}\n"
+            f"❌ Códigos do catálogo sem arquivo: {faltando}"
+        )
+    
+    def _reindexar_erro(self, erro):
+        self.hide_progress()
+        messagebox.showerror("Erro", f"Erro ao indexar pasta de músicas:\n{erro}")
 
     def setup_ui(self):
         self.debug_log("Configurando interface...")
@@ -783,6 +845,17 @@ class KaraokePlayer:
             padx=8,
             pady=2
         ).pack(side=tk.LEFT)
+        tk.Button(
+            pasta_frame,
+            text="🔄 Reindexar",
+            command=self.reindexar_pasta_musicas,
+            bg="#555555",
+            fg="white",
+            font=("Arial", 9, "bold"),
+            cursor="hand2",
+            padx=8,
+            pady=2
+        ).pack(side=tk.LEFT, padx=(6, 0))
 
         # Lado direito: Progresso (compacto)
         self.progress_frame = tk.Frame(pasta_progress_frame, bg="#232323", bd=1, relief=tk.SUNKEN, width=260)
@@ -1027,6 +1100,22 @@ class KaraokePlayer:
         )
         self.pitch_label.pack(pady=(8, 0), fill=tk.X)
 
+        # Tom em tempo real: muda o tom durante a música, sem parar nem processar com o ffmpeg
+        self.tom_tempo_real_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            left_column,
+            text="⚡ Tom em tempo real",
+            variable=self.tom_tempo_real_var,
+            command=self.alternar_tom_tempo_real,
+            state=tk.NORMAL if TEMPO_REAL_DISPONIVEL else tk.DISABLED,
+            bg="#181828",
+            fg="#BBB",
+            selectcolor="#222",
+            activebackground="#181828",
+            activeforeground="white",
+            font=("Arial", 8)
+        ).pack(anchor=tk.W, pady=(4, 0))
+
         # COLUNA DIREITA: Controle de Velocidade
         right_column = tk.Frame(pitch_inner, bg="#181828")
         right_column.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(8, 0))
@@ -1457,6 +1546,7 @@ class KaraokePlayer:
         pasta = filedialog.askdirectory(title="Selecione a pasta de músicas")
         if pasta:
             self.music_folder = pasta
+            self.media_index.definir_pasta(pasta)
             if hasattr(self, 'music_folder_var'):
                 self.music_folder_var.set(self.music_folder)
             self.debug_log(f"Pasta de músicas alterada para: {self.music_folder}")
@@ -2084,21 +2174,8 @@ class KaraokePlayer:
             self.file_label.config(text=f"🎤 {item['participante_nome']} - {os.path.basename(item['arquivo_path'])}")
             
             try:
-                # Obtém informações do vídeo
-                result = subprocess.run([
-                    'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                    '-show_format', '-show_streams', self.video_file
-                ], capture_output=True, text=True, check=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
-                
-                info = json.loads(result.stdout)
-                for stream in info['streams']:
-                    if stream['codec_type'] == 'video':
-                        self.fps = eval(stream.get('r_frame_rate', '30/1'))
-                        self.width = stream['width']
-                        self.height = stream['height']
-                        break
-                self.duration = float(info['format']['duration'])
+                # Obtém informações do vídeo (ffprobe só se ainda não sondado)
+                self._aplicar_media_info(sondar_midia(self.video_file))
             except FileNotFoundError:
                 self.debug_log("⚠️ FFprobe não encontrado")
                 messagebox.showerror("Erro", "FFprobe não encontrado!")
@@ -2107,9 +2184,15 @@ class KaraokePlayer:
                 self.debug_log(f"⚠️ Erro ao obter informações do vídeo: {e}")
             
             # Processa tom se necessário
-            if self.pitch_shift != 0:
-                self.process_audio_with_pitch()
-                self.root.after(1000, self._check_and_play)
+            if self.pitch_shift != 0 and not self._usar_tom_tempo_real():
+                # Vídeo removido/movido desde a indexação: sem faixa em cache
+                pronto = os.path.exists(self.video_file) and self.pitch_cache.obter(self.video_file, self.pitch_shift)
+                self.audio_tom = pronto or None
+                if self.audio_tom:
+                    self.play()
+                elif not self._tocar_tom_progressivo():
+                    self.process_audio_with_pitch()
+                    self.root.after(1000, self._check_and_play)
             else:
                 self.processed_file = self.video_file
                 self.play()
@@ -2148,11 +2231,20 @@ class KaraokePlayer:
         db = KaraokeDatabase()
         self.playlist_items = db.obter_playlist(evento_id)
         self.atualizar_playlist_visual()
+        
+        # Prepara em segundo plano (tom e metadados) as próximas músicas da fila
+        if getattr(self, 'modo_evento_ativo', False):
+            atual = getattr(self, 'musica_atual_evento', None)
+            self.prefetch.agendar(self.playlist_items, atual_id=atual['id'] if atual else None)
     
     def abrir_youtube_downloader(self):
         """Abre janela para buscar e baixar vídeos do YouTube"""
         self.debug_log("📥 Abrindo YouTube Downloader...")
-        YouTubeDownloaderWindow(self.root, self.music_folder)
+        YouTubeDownloaderWindow(
+            self.root,
+            self.music_folder,
+            ao_baixar=lambda arquivo: self.media_index.agendar_atualizacao()
+        )
         
     def abrir_modo_evento(self):
         if not MODO_EVENTO_DISPONIVEL:
@@ -2401,20 +2493,8 @@ class KaraokePlayer:
         self.video_file = musica['arquivo_path']
         
         try:
-            result = subprocess.run([
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', self.video_file
-            ], capture_output=True, text=True, check=True,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
-            
-            info = json.loads(result.stdout)
-            for stream in info['streams']:
-                if stream['codec_type'] == 'video':
-                    self.fps = eval(stream.get('r_frame_rate', '30/1'))
-                    self.width = stream['width']
-                    self.height = stream['height']
-                    break
-            self.duration = float(info['format']['duration'])
+            # Normalmente já sondado pelo pré-carregamento da fila
+            self._aplicar_media_info(sondar_midia(self.video_file))
         except FileNotFoundError:
             self.debug_log("⚠️ FFprobe não encontrado")
             messagebox.showerror("Erro", "FFprobe não encontrado!")
@@ -2425,7 +2505,17 @@ class KaraokePlayer:
         self.pitch_shift = musica['tom_ajuste']
         self.pitch_label.config(text=f"{self.pitch_shift:+d}" if self.pitch_shift != 0 else "0")
         
-        if self.pitch_shift != 0:
+        if self.pitch_shift != 0 and not self._usar_tom_tempo_real():
+            pronto = os.path.exists(self.video_file) and self.pitch_cache.obter(self.video_file, self.pitch_shift)
+            if pronto:
+                # Tom já preparado pelo pré-carregamento: toca sem esperar
+                self.audio_tom = pronto
+                self.processed_file = self.video_file
+                self.play()
+                return
+            if self._tocar_tom_progressivo():
+                return
+            self.audio_tom = None
             self.processed_file = None
             self.process_audio_with_pitch()
             self.root.after(1000, self._check_and_play)
@@ -2433,6 +2523,38 @@ class KaraokePlayer:
             self.processed_file = self.video_file
             self.play()
     
+    def _tocar_tom_progressivo(self):
+        """Tom fora do cache: começa a tocar enquanto o ffmpeg ainda gera a faixa.
+
+        O áudio no tom sai do ffmpeg em ordem de tempo e é tocado pelo motor de
+        tempo real (sem alterar o tom de novo) assim que o primeiro trecho chega;
+        o mesmo ffmpeg grava a faixa no cache para as próximas vezes. Retorna
+        False se não for possível (sem NumPy/sounddevice ou tom já em geração).
+        """
+        if not TEMPO_REAL_DISPONIVEL or not os.path.exists(self.video_file):
+            return False
+        try:
+            render = self.pitch_cache.iniciar_progressivo(self.video_file, self.pitch_shift)
+        except Exception as e:
+            self.debug_log(f"⚠️ Erro ao iniciar geração progressiva do tom: {e}")
+            return False
+        if render is None:
+            return False
+        self.debug_log(f"🎵 Tom {self.pitch_shift:+d} sendo gerado durante a reprodução")
+        self.audio_tom = None
+        self.processed_file = self.video_file
+        self.render_tom = render
+        self.play()
+        return True
+    
+    def _aplicar_media_info(self, info):
+        """Usa os metadados (MediaInfo) do vídeo carregado"""
+        self.media_info = info
+        self.fps = info.fps
+        self.width = info.width
+        self.height = info.height
+        self.duration = info.duration
+    
     def _check_and_play(self):
         if self.processed_file and not self.processing_pitch:
             self.play()
@@ -2469,21 +2591,8 @@ class KaraokePlayer:
         
         if path:
             try:
-                result = subprocess.run([
-                    'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                    '-show_format', '-show_streams', path
-                ], capture_output=True, text=True, check=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
-                
-                info = json.loads(result.stdout)
-                for stream in info['streams']:
-                    if stream['codec_type'] == 'video':
-                        self.fps = eval(stream.get('r_frame_rate', '30/1'))
-                        self.width = stream['width']
-                        self.height = stream['height']
-                        break
-                
-                self.duration = float(info['format']['duration'])
+                # ffprobe só na primeira vez: depois vem da tabela media_metadata
+                self._aplicar_media_info(sondar_midia(path))
                 self.video_file = path
                 self.processed_file = path
                 self.pitch_shift = 0
@@ -2559,6 +2668,18 @@ class KaraokePlayer:
         if not self.video_file or self.processing_pitch:
             return
         
+        if self._usar_tom_tempo_real():
+            # Sem parar a música: o novo tom vale a partir do próximo bloco de áudio
+            self.pitch_shift += steps
+            if hasattr(self, 'pitch_var'):
+                self.pitch_var.set(self.pitch_shift)
+            self.pitch_label.config(text=f"Tom: {self.pitch_shift:+d}" if self.pitch_shift != 0 else "Tom: 0")
+            if self.motor_tom:
+                # Áudio do render progressivo já vem no tom dele: aplica só a diferença
+                self.motor_tom.definir_semitons(self.pitch_shift - self._tom_pre_afinado)
+            self.status_label.config(text=f"✓ Tom: {self.pitch_shift:+d} (tempo real)")
+            return
+        
         if self.is_playing:
             self.stop()
         
@@ -2573,11 +2694,6 @@ class KaraokePlayer:
         if self.pitch_shift != 0:
             self.process_audio_with_pitch()
         else:
-            if self.processed_file != self.video_file:
-                try:
-                    os.unlink(self.processed_file)
-                except:
-                    pass
             self.processed_file = self.video_file
             self.root.config(cursor="")
             self.hide_progress()
@@ -2591,6 +2707,8 @@ class KaraokePlayer:
         if self.player and self.is_playing:
             try:
                 self.player.set_rate(speed)
+                if self.motor_tom:
+                    self.motor_tom.definir_velocidade(speed)
                 self.debug_log(f"⚡ Velocidade alterada para: {speed}x")
             except Exception as e:
                 self.debug_log(f"⚠️ Erro ao alterar velocidade: {e}")
@@ -2602,32 +2720,12 @@ class KaraokePlayer:
         
         def proc():
             try:
-                temp = tempfile.mktemp(suffix='.mp4')
-                ratio = 2 ** (self.pitch_shift / 12.0)
-                tempo = 1.0 / ratio
-                
-                if 0.5 <= tempo <= 2.0:
-                    filt = f'asetrate=44100*{ratio},aresample=44100,atempo={tempo}'
-                else:
-                    filt = f'asetrate=44100*{ratio},aresample=44100'
-                
-                subprocess.run([
-                    'ffmpeg', '-y', '-i', self.video_file,
-                    '-filter_complex', f'[0:a]{filt}[audio]',
-                    '-map', '0:v', '-map', '[audio]',
-                    '-c:v', 'copy', '-c:a', 'aac',
-                    temp
-                ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-                
-                if self.processed_file != self.video_file:
-                    try:
-                        os.unlink(self.processed_file)
-                    except:
-                        pass
-                
-                self.processed_file = temp
+                # Só o áudio é processado; faixas já geradas (mesma música e tom) saem do cache
+                self.audio_tom = self.pitch_cache.obter_ou_gerar(self.video_file, self.pitch_shift)
+                self.processed_file = self.video_file
                 self.root.after(0, self._pitch_ok)
-            except:
+            except Exception as e:
+                self.debug_log(f"❌ Erro no processamento de tom: {e}")
                 self.root.after(0, self._pitch_erro)
             finally:
                 self.processing_pitch = False
@@ -2645,6 +2743,7 @@ class KaraokePlayer:
         self.hide_progress()
         self.pitch_shift = 0
         self.pitch_label.config(text="0")
+        self.audio_tom = None
         self.processed_file = self.video_file
     
     def play(self):
@@ -2664,9 +2763,15 @@ class KaraokePlayer:
             return
         
         # Reproduz com VLC
+        render, self.render_tom = self.render_tom, None
         try:
             # Preparar mídia
-            media = self.vlc_instance.media_new(self.processed_file)
+            tom_tempo_real = render is not None or self._usar_tom_tempo_real()
+            media = self.vlc_instance.media_new(self.video_file if tom_tempo_real else self.processed_file)
+            tocar_audio_tom = not tom_tempo_real and self.pitch_shift != 0 and self.audio_tom
+            if tocar_audio_tom:
+                # Vídeo original + faixa de áudio no tom escolhido
+                anexar_audio_tom(media, self.audio_tom)
             self.player.set_media(media)
             
             # Embutir VLC na janela secundária se disponível
@@ -2690,6 +2795,12 @@ class KaraokePlayer:
             
             self.player.play()
             self.is_playing = True
+            if tocar_audio_tom:
+                self._selecionar_audio_tom()
+            if tom_tempo_real:
+                self._iniciar_tom_tempo_real(render)
+            elif self.motor_tom:
+                self._parar_tom_tempo_real()
             
             # Aplicar velocidade de reprodução
             if hasattr(self, 'playback_speed'):
@@ -2714,11 +2825,99 @@ class KaraokePlayer:
             self.debug_log("▶ Play")
         except Exception as e:
             self.debug_log(f"❌ Erro ao reproduzir: {e}")
+            if render is not None:
+                render.finalizar(False)
+    
+    def _selecionar_audio_tom(self, tentativas=20):
+        """Troca para a faixa com o tom alterado assim que o VLC listar as faixas de áudio"""
+        try:
+            if selecionar_audio_tom(self.player):
+                return
+        except Exception as e:
+            self.debug_log(f"⚠️ Erro ao selecionar faixa de áudio do tom: {e}")
+            return
+        if tentativas > 0:
+            self.root.after(100, lambda: self._selecionar_audio_tom(tentativas - 1))
+    
+    def _usar_tom_tempo_real(self):
+        """Tom em tempo real ligado (e NumPy/sounddevice disponíveis)"""
+        return (TEMPO_REAL_DISPONIVEL and hasattr(self, 'tom_tempo_real_var')
+                and self.tom_tempo_real_var.get())
+    
+    def alternar_tom_tempo_real(self):
+        """Liga/desliga o tom em tempo real; vale a partir da próxima música tocada"""
+        ativo = self._usar_tom_tempo_real()
+        self.prefetch.gerar_tom = not ativo
+        if not ativo and self.motor_tom and self.motor_tom.ativo:
+            self._parar_tom_tempo_real()
+            if self.pitch_shift != 0:
+                self.status_label.config(text="Tom em tempo real desligado: reaplique o tom")
+        self.debug_log(f"⚡ Tom em tempo real {'ligado' if ativo else 'desligado'}")
+    
+    def _iniciar_tom_tempo_real(self, render=None):
+        """Toca o áudio pelo motor de tom em tempo real, com o VLC mudo mostrando o vídeo.
+
+        Com render (RenderizacaoProgressiva) o motor toca o áudio que o ffmpeg
+        está gerando, que já vem no tom escolhido.
+        """
+        try:
+            if self.motor_tom is None:
+                self.motor_tom = PitchTempoReal(log=self.debug_log)
+            if render is not None:
+                self.motor_tom.carregar(self.video_file, self.duration,
+                                        fonte=render.processo, ao_terminar=render.finalizar)
+                self._tom_pre_afinado = render.semitons
+            elif self.motor_tom.video_file != self.video_file or self._tom_pre_afinado:
+                self.motor_tom.carregar(self.video_file, self.duration)
+                self._tom_pre_afinado = 0
+            self.motor_tom.definir_semitons(self.pitch_shift - self._tom_pre_afinado)
+            self.motor_tom.definir_velocidade(getattr(self, 'playback_speed', 1.0))
+            self.player.audio_set_mute(True)
+            self.motor_tom.iniciar(0.0)
+            self._agendar_sincronia_tom()
+        except Exception as e:
+            self.debug_log(f"⚠️ Erro no tom em tempo real, usando áudio do vídeo: {e}")
+            self._parar_tom_tempo_real()
+            if render is not None:
+                render.finalizar(False)
+    
+    def _agendar_sincronia_tom(self):
+        """Agenda a próxima sincronia, cancelando a pendente (um único laço por vez)"""
+        if self._sincronia_tom_id is not None:
+            self.root.after_cancel(self._sincronia_tom_id)
+        self._sincronia_tom_id = self.root.after(200, self._sincronizar_tom_tempo_real)
+    
+    def _sincronizar_tom_tempo_real(self):
+        """Mantém o áudio do motor alinhado ao relógio do VLC (pausa, seek, fim da música)"""
+        self._sincronia_tom_id = None
+        if not self.motor_tom or not self.motor_tom.ativo:
+            return
+        estado = self.player.get_state()
+        if estado in (vlc.State.Ended, vlc.State.Stopped, vlc.State.Error):
+            self._parar_tom_tempo_real()
+            return
+        self.motor_tom.pausar(estado != vlc.State.Playing)
+        if estado == vlc.State.Playing:
+            self.motor_tom.sincronizar(self.player.get_time() / 1000.0)
+        self._agendar_sincronia_tom()
+    
+    def _parar_tom_tempo_real(self):
+        if self._sincronia_tom_id is not None:
+            self.root.after_cancel(self._sincronia_tom_id)
+            self._sincronia_tom_id = None
+        if self.motor_tom:
+            self.motor_tom.parar()
+        try:
+            self.player.audio_set_mute(False)
+        except Exception:
+            pass
     
     def pause(self):
         """Pausa reprodução do vídeo"""
         if self.player and self.is_playing:
             self.player.pause()
+            if self.motor_tom:
+                self.motor_tom.pausar()
             self.is_playing = False
             self.status_label.config(text="⏸ Pausado")
             self.debug_log("⏸ Pause")
@@ -2727,6 +2926,7 @@ class KaraokePlayer:
         """Para reprodução do vídeo"""
         if self.player:
             self.player.stop()
+            self._parar_tom_tempo_real()
             self.is_playing = False
             self.status_label.config(text="⏹ Parado")
             self.debug_log("⏹ Stop")
@@ -3033,44 +3233,93 @@ class KaraokePlayer:
 
 
     def carregar_catalogo(self):
-        """Limpa o catálogo e importa o CSV selecionado para o banco de dados."""
-        try:
-            from tkinter import filedialog, messagebox
-            csv_path = filedialog.askopenfilename(
-                title="Selecione o arquivo CSV do catálogo",
-                filetypes=[("CSV", "*.csv"), ("Todos os arquivos", "*.*")]
-            )
-            if not csv_path:
-                self.debug_log("[CATALOGO] Nenhum arquivo CSV selecionado.")
+        """Importa o CSV selecionado em segundo plano: carga completa com barra de progresso ou só as diferenças."""
+        from tkinter import filedialog, messagebox
+        csv_path = filedialog.askopenfilename(
+            title="Selecione o arquivo CSV do catálogo",
+            filetypes=[("CSV", "*.csv"), ("Todos os arquivos", "*.*")]
+        )
+        if not csv_path:
+            self.debug_log("[CATALOGO] Nenhum arquivo CSV selecionado.")
+            return
+        
+        self.debug_log(f"[CATALOGO] CSV selecionado: {csv_path}")
+        
+        # Com catálogo já carregado, o padrão é aplicar só as diferenças do novo CSV
+        diferencial = False
+        if KaraokeDatabase().contar_catalogo() > 0:
+            resposta = messagebox.askyesnocancel(
+                "Atualizar Catálogo",
+                "Já existe um catálogo carregado.\n\n"
+                "Sim: atualizar apenas as músicas novas, alteradas ou removidas (recomendado)\n"
+                "Não: limpar o catálogo e importar tudo novamente")
+            if resposta is None:
                 return
+            diferencial = resposta
+        
+        if diferencial:
+            self.show_progress("Atualizando catálogo...")
             
-            self.debug_log(f"[CATALOGO] CSV selecionado: {csv_path}")
-            db = KaraokeDatabase()
-            
-            # Pergunta se deseja limpar o catálogo antes
-            if messagebox.askyesno("Limpar Catálogo", 
-                                "Deseja limpar o catálogo antes de importar?\n(Isso removerá todas as músicas do catálogo atual)"):
-                self.debug_log("[CATALOGO] Limpando catálogo antes de importar.")
-                db.limpar_catalogo()
-            
-            self.show_progress("Importando catálogo CSV...")
-            self.root.update()
-            
-            # Importa o CSV
-            num = db.importar_catalogo_csv(csv_path)
+            def proc_diferencial():
+                try:
+                    resultado = KaraokeDatabase().sincronizar_catalogo_csv(csv_path)
+                    self.debug_log(f"[CATALOGO] Atualização concluída: {resultado}")
+                    self.root.after(0, lambda: self._catalogo_sincronizado(resultado))
+                except Exception as e:
+                    self.debug_log(f"[CATALOGO] ERRO: {e}")
+                    self.root.after(0, lambda erro=e: self._catalogo_erro(erro))
             
-            self.hide_progress()
-            self.debug_log(f"[CATALOGO] Importação concluída. {num} músicas importadas.")
-            messagebox.showinfo("Catálogo", f"Catálogo CSV importado com sucesso!\n{num} músicas adicionadas.")
+            threading.Thread(target=proc_diferencial, daemon=True).start()
+            return
         
-        except FileNotFoundError as e:
-            self.debug_log(f"[CATALOGO] ERRO: {e}")
-            messagebox.showerror("Erro", str(e))
+        self.show_progress("Importando catálogo CSV...")
+        # Barra determinada: o progresso vem da importação, não da animação
+        self.progress_animation_running = False
+        self.progress_canvas.coords(self.progress_bar, 0, 0, 0, 15)
         
-        except Exception as e:
-            self.debug_log(f"[CATALOGO] ERRO: {e}")
-            self.hide_progress()
-            messagebox.showerror("Erro", f"Erro ao importar catálogo CSV:\n{e}")
+        def progresso(linhas, fracao):
+            self.root.after(0, lambda: self._progresso_catalogo(linhas, fracao))
+        
+        def proc():
+            try:
+                db = KaraokeDatabase()
+                substituir = db.contar_catalogo() > 0
+                if substituir:
+                    self.debug_log("[CATALOGO] Substituindo o catálogo atual (mesma transação da importação).")
+                num = db.importar_catalogo_csv(csv_path, progresso=progresso, substituir=substituir)
+                self.debug_log(f"[CATALOGO] Importação concluída. {num} músicas importadas.")
+                self.root.after(0, lambda: self._catalogo_importado(num))
+            except Exception as e:
+                self.debug_log(f"[CATALOGO] ERRO: {e}")
+                self.root.after(0, lambda erro=e: self._catalogo_erro(erro))
+        
+        threading.Thread(target=proc, daemon=True).start()
+    
+    def _progresso_catalogo(self, linhas, fracao):
+        self.progress_canvas.coords(self.progress_bar, 0, 0, int(250 * fracao), 15)
+        self.progress_label.config(text=f"Importando catálogo... {int(fracao * 100)}% ({linhas} músicas)")
+    
+    def _catalogo_importado(self, num):
+        self.hide_progress()
+        messagebox.showinfo("Catálogo", f"Catálogo CSV importado com sucesso!\n{num} músicas adicionadas.")
+    
+    def _catalogo_sincronizado(self, resultado):
+        self.hide_progress()
+        messagebox.showinfo(
+            "Catálogo",
+            f"✅ Catálogo atualizado!\n\n"
+            f"➕ Códigos novos: {resultado['novos']}\n"
+            f"✏️ Códigos alterados: {resultado['alterados']}\n"
+            f"➖ Códigos removidos: {resultado['removidos']}\n"
+            f"✓ Códigos inalterados: {resultado['inalterados']}"
+        )
+    
+    def _catalogo_erro(self, erro):
+        self.hide_progress()
+        if isinstance(erro, FileNotFoundError):
+            messagebox.showerror("Erro", str(erro))
+        else:
+            messagebox.showerror("Erro", f"Erro ao importar catálogo CSV:\n{erro}")
 
 
 # NO FINAL DO ARQUIVO, modifique a parte principal:
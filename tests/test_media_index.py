@@ -0,0 +1,60 @@
+"""Testes do reescaneamento incremental do índice de mídia (MediaIndex.atualizar)."""
+import os
+import time
+
+import pytest
+
+from karaoke_database import KaraokeDatabase
+from karaoke_media_index import RESOLUCAO_MTIME, MediaIndex
+
+
+@pytest.fixture
+def indice(tmp_path):
+    pasta = tmp_path / "musicas"
+    pasta.mkdir()
+    db = KaraokeDatabase(str(tmp_path / "indice.db"))
+    yield MediaIndex(str(pasta), db=db, log=lambda mensagem: None), pasta
+    db.fechar_conexao()
+
+
+def fixar_mtime(diretorio, mtime):
+    os.utime(diretorio, (mtime, mtime))
+
+
+def test_arquivo_criado_no_mesmo_tique_do_mtime(indice):
+    # Simula um sistema de arquivos de resolução grossa (FAT): o arquivo novo não altera o mtime
+    media_index, pasta = indice
+    mtime = time.time()
+    (pasta / "00001.mp4").touch()
+    fixar_mtime(pasta, mtime)
+    media_index.atualizar()
+
+    (pasta / "00002.mp4").touch()
+    fixar_mtime(pasta, mtime)
+    media_index.atualizar()
+
+    assert media_index.buscar_arquivo("2") == str(pasta / "00002.mp4")
+
+
+def test_diretorio_estavel_nao_e_relistado(indice):
+    media_index, pasta = indice
+    (pasta / "00001.mp4").touch()
+    fixar_mtime(pasta, time.time() - 10 * RESOLUCAO_MTIME)
+
+    assert media_index.atualizar()['diretorios_relistados'] == 1
+    estatisticas = media_index.atualizar()
+    assert estatisticas['diretorios_relistados'] == 0
+    assert estatisticas['diretorios_ignorados'] == 1
+
+
+def test_diretorio_recente_e_relistado_ate_estabilizar(indice):
+    media_index, pasta = indice
+    (pasta / "00001.mp4").touch()
+    fixar_mtime(pasta, time.time())
+
+    media_index.atualizar()
+    assert media_index.atualizar()['diretorios_relistados'] == 1
+
+    fixar_mtime(pasta, time.time() - 10 * RESOLUCAO_MTIME)
+    media_index.atualizar()
+    assert media_index.atualizar()['diretorios_ignorados'] == 1
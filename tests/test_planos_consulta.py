@@ -0,0 +1,114 @@
+"""Verifica com EXPLAIN QUERY PLAN se as consultas frequentes usam índices.
+
+Executa os métodos do KaraokeDatabase usados a cada música (playlist,
+próxima música, busca no catálogo, índice de mídia...) num banco temporário,
+captura o SQL realmente executado e confere o plano de cada SELECT/DELETE/UPDATE:
+nenhuma tabela pode ser percorrida inteira (SCAN, mesmo que por um índice,
+fora das exceções de SCANS_PERMITIDOS) e, nas consultas
+que listam na ordem do evento, a ordenação não pode exigir uma B-tree
+temporária (as buscas no catálogo ordenam só os resultados encontrados, por
+relevância). Roda com e sem FTS5.
+"""
+import re
+
+import pytest
+
+from karaoke_database import KaraokeDatabase
+
+
+def preparar(db):
+    conn = db._conexao()
+    conn.executemany("""
+        INSERT INTO catalogo (cantor, cod, musica, inicio, cantor_norm, musica_norm)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(f"CANTOR {i}", str(i), f"MUSICA {i}", "la la", f"cantor {i}", f"musica {i}") for i in range(200)])
+    conn.commit()
+    if db.fts_disponivel:
+        conn.execute("INSERT INTO catalogo_fts(catalogo_fts) VALUES ('rebuild')")
+    db._reconstruir_trigramas(conn.cursor())
+    conn.commit()
+
+    evento_id = db.criar_evento("Planos")
+    participante_id = db.adicionar_participante(evento_id, "Participante")
+    musica_id = db.adicionar_musica_playlist(evento_id, participante_id, "/musicas/00001.mp4")
+    db.atualizar_diretorios_midia("/musicas", {"/musicas": (None, 0.0, [("00001", "/musicas/00001.mp4")])}, [])
+    return evento_id, participante_id, musica_id
+
+
+def consultas_frequentes(db, evento_id, participante_id, musica_id):
+    """{nome: (função, ordem vem do índice)} de cada operação verificada"""
+    return {
+        "buscar_musica_por_codigo": (lambda: db.buscar_musica_por_codigo("10"), True),
+        "obter_playlist": (lambda: db.obter_playlist(evento_id), True),
+        "obter_proxima_musica": (lambda: db.obter_proxima_musica(evento_id), True),
+        "obter_participantes": (lambda: db.obter_participantes(evento_id), True),
+        "adicionar_musica_playlist":
+            (lambda: db.adicionar_musica_playlist(evento_id, participante_id, "/m/2.mp4"), True),
+        "marcar_musica_tocada": (lambda: db.marcar_musica_tocada(musica_id, 120.0), True),
+        "buscar_catalogo": (lambda: db.buscar_catalogo("cantor 1"), False),
+        "buscar_catalogo_palavra_curta": (lambda: db.buscar_catalogo("mu"), False),
+        "buscar_catalogo_codigo": (lambda: db.buscar_catalogo("10"), False),
+        "contar_catalogo": (lambda: db.contar_catalogo(), True),
+        "buscar_catalogo_aproximado": (lambda: db.buscar_catalogo_aproximado("cantr 1"), False),
+        "buscar_catalogo_pagina": (lambda: db.buscar_catalogo_pagina(("CANTOR 1", "MUSICA 1", 2)), True),
+        "carregar_indice_midia": (lambda: db.carregar_indice_midia("/musicas"), True),
+        "listar_codigos_duplicados": (lambda: db.listar_codigos_duplicados("/musicas"), True),
+        "obter_metadados_midia": (lambda: db.obter_metadados_midia("/musicas/00001.mp4", 1, 1), True),
+        "remover_participante": (lambda: db.remover_participante(participante_id), True),
+    }
+
+
+OPERACOES = list(consultas_frequentes(None, None, None, None))
+
+# Varreduras intencionais: {operação: {tabela}}
+SCANS_PERMITIDOS = {
+    # COUNT(*) sem filtro precisa passar por todas as linhas (o SQLite usa o menor índice)
+    "contar_catalogo": {"catalogo"},
+}
+
+
+def problemas_do_plano(conn, sql, ordem_indexada, permitidas=frozenset()):
+    tabelas = {nome for nome, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    plano = [linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    problemas = []
+    for detalhe in plano:
+        varrida = re.match(r"SCAN (\w+)", detalhe)
+        # Tabela virtual (FTS5) resolve o MATCH pelo próprio índice; o plano mostra "VIRTUAL TABLE"
+        if (varrida and varrida.group(1) in tabelas and "VIRTUAL TABLE" not in detalhe
+                and varrida.group(1) not in permitidas):
+            problemas.append(detalhe)
+        elif ordem_indexada and "USE TEMP B-TREE" in detalhe:
+            problemas.append(detalhe)
+    return problemas
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "sem_fts5"])
+def banco(request, tmp_path):
+    db = KaraokeDatabase(str(tmp_path / "planos.db"))
+    if request.param and not db.fts_disponivel:
+        pytest.skip("SQLite sem FTS5")
+    # Sem FTS5: busca pelos índices das colunas normalizadas
+    db.fts_disponivel = request.param
+    ids = preparar(db)
+    yield db, ids
+    db.fechar_conexao()
+
+
+@pytest.mark.parametrize("nome", OPERACOES)
+def test_consulta_usa_indices(banco, nome):
+    db, ids = banco
+    executar, ordem_indexada = consultas_frequentes(db, *ids)[nome]
+    conn = db._conexao()
+    executados = []
+    conn.set_trace_callback(executados.append)
+    try:
+        executar()
+    finally:
+        conn.set_trace_callback(None)
+
+    problemas = []
+    for sql in executados:
+        if sql.lstrip().upper().startswith(("SELECT", "DELETE", "UPDATE")):
+            problemas.extend(problemas_do_plano(conn, sql, ordem_indexada, SCANS_PERMITIDOS.get(nome, set())))
+    assert executados, "nenhum SQL executado"
+    assert not problemas, "; ".join(problemas)
@@ -0,0 +1,90 @@
+"""Testes do protocolo binário painel -> player (karaoke_protocolo).
+
+Codifica e decodifica cada comando (ida e volta), manda as mensagens por
+um par de sockets como o servidor do player as recebe, e confere que
+mensagens inválidas (versão, comando, corpo truncado ou com sobra) são
+recusadas com ErroProtocolo, assim como dados que não cabem no formato
+ao codificar.
+"""
+import socket
+import struct
+
+import pytest
+
+from karaoke_media_info import MediaInfo
+from karaoke_protocolo import (CABECALHO, MAGICO, VERSAO_PROTOCOLO, ErroProtocolo, codificar_mensagem,
+                               decodificar_mensagem, enviar_comando, receber_mensagem)
+
+INFO = MediaInfo(215.46, 30000 / 1001, 1920, 1080, 48000, 'h264', 'aac')
+
+# (comando, dados enviados, dados esperados na decodificação)
+CASOS = (
+    ('load', {'path': 'C:\\Músicas\\00123 - Canção.mp4', 'info': INFO},
+     {'path': 'C:\\Músicas\\00123 - Canção.mp4', 'info': INFO}),
+    ('load', {'path': '/musicas/1.mp4'}, {'path': '/musicas/1.mp4', 'info': None}),
+    ('load', {'path': '/musicas/2.mp4', 'info': MediaInfo(10.0, 25.0, 640, 480)},
+     {'path': '/musicas/2.mp4', 'info': MediaInfo(10.0, 25.0, 640, 480)}),
+    ('load', {'path': '/m/3.mp4', 'duration': 12.5, 'fps': 24, 'width': 320, 'height': 240},
+     {'path': '/m/3.mp4', 'info': MediaInfo(12.5, 24.0, 320, 240)}),
+    ('play', None, None),
+    ('pause', None, None),
+    ('stop', None, None),
+    ('quit', None, None),
+    ('pitch', {'steps': -5}, {'steps': -5}),
+    ('pitch', {'steps': 12}, {'steps': 12}),
+    ('seek', {'time': 83.25}, {'time': 83.25}),
+)
+
+MENSAGENS_INVALIDAS = (
+    ("versão desconhecida", CABECALHO.pack(MAGICO, VERSAO_PROTOCOLO + 1, 2, 0)),
+    ("mágico errado", CABECALHO.pack(b'XX', VERSAO_PROTOCOLO, 2, 0)),
+    ("comando desconhecido", CABECALHO.pack(MAGICO, VERSAO_PROTOCOLO, 99, 0)),
+    ("corpo truncado", codificar_mensagem('seek', {'time': 1.0})[:-1]),
+    ("corpo com sobra", CABECALHO.pack(MAGICO, VERSAO_PROTOCOLO, 6, 9) + struct.pack('>dB', 1.0, 0)),
+    ("texto truncado", CABECALHO.pack(MAGICO, VERSAO_PROTOCOLO, 1, 3) + b'\x00\x10a'),
+    ("corpo grande demais", CABECALHO.pack(MAGICO, VERSAO_PROTOCOLO, 1, 10 ** 6)),
+    ("pickle antigo", len(b'\x80\x04}').to_bytes(4, 'big') + b'\x80\x04}'),
+)
+
+# Dados que não cabem no formato: codificar_mensagem recusa com ErroProtocolo
+DADOS_INVALIDOS = (
+    ('pitch', {'steps': 40000}),
+    ('pitch', {'steps': 1.5}),
+    ('seek', {'time': 'x'}),
+    ('load', {}),
+    ('load', {'path': '/m/1.mp4', 'info': MediaInfo(1.0, 25.0, -1, 480)}),
+    ('volume', None),
+)
+
+
+@pytest.mark.parametrize("comando, dados, esperado", CASOS)
+def test_ida_e_volta(comando, dados, esperado):
+    assert decodificar_mensagem(codificar_mensagem(comando, dados)) == (comando, esperado)
+
+
+def test_mensagens_seguidas_pelo_socket():
+    a, b = socket.socketpair()
+    try:
+        for comando, dados, _ in CASOS:
+            enviar_comando(a, comando, dados)
+        a.shutdown(socket.SHUT_WR)
+        recebidos = []
+        while (mensagem := receber_mensagem(b)) is not None:
+            recebidos.append(mensagem)
+    finally:
+        a.close()
+        b.close()
+    assert recebidos == [(comando, esperado) for comando, _, esperado in CASOS]
+
+
+@pytest.mark.parametrize("mensagem", [m for _, m in MENSAGENS_INVALIDAS],
+                         ids=[d for d, _ in MENSAGENS_INVALIDAS])
+def test_recusa_mensagem_invalida(mensagem):
+    with pytest.raises(ErroProtocolo):
+        decodificar_mensagem(mensagem)
+
+
+@pytest.mark.parametrize("comando, dados", DADOS_INVALIDOS)
+def test_recusa_dados_ao_codificar(comando, dados):
+    with pytest.raises(ErroProtocolo):
+        codificar_mensagem(comando, dados)